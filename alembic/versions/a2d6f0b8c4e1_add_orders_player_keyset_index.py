@@ -0,0 +1,50 @@
+"""add orders player keyset index
+
+Revision ID: a2d6f0b8c4e1
+Revises: f1a8d3c6b9e4
+Create Date: 2026-10-17 19:20:38.117450
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a2d6f0b8c4e1'
+down_revision: Union[str, Sequence[str], None] = 'f1a8d3c6b9e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def is_postgres() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def create_index_online(name, table, columns, **kw):
+    """CREATE INDEX CONCURRENTLY on Postgres (outside the migration transaction), plain elsewhere."""
+    if is_postgres():
+        with op.get_context().autocommit_block():
+            op.create_index(name, table, columns, postgresql_concurrently=True, **kw)
+    else:
+        op.create_index(name, table, columns, **kw)
+
+
+def drop_index_online(name, table):
+    if is_postgres():
+        with op.get_context().autocommit_block():
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+    else:
+        op.drop_index(name, table_name=table)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # GET /orders: a player's orders, newest first
+    create_index_online('ix_orders_user_created_id', 'orders', ['user_id', 'created_at', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_online('ix_orders_user_created_id', 'orders')
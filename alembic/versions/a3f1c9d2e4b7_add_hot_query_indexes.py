@@ -0,0 +1,93 @@
+"""add hot query indexes
+
+Revision ID: a3f1c9d2e4b7
+Revises: 2c487b889c20
+Create Date: 2026-10-17 09:12:40.518301
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f1c9d2e4b7'
+down_revision: Union[str, Sequence[str], None] = '2c487b889c20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+PENDING = sa.text("status = 'PENDING'")
+
+
+def is_postgres() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def create_index_online(name, table, columns, **kw):
+    """CREATE INDEX CONCURRENTLY on Postgres (outside the migration transaction), plain elsewhere."""
+    if is_postgres():
+        with op.get_context().autocommit_block():
+            op.create_index(name, table, columns, postgresql_concurrently=True, **kw)
+    else:
+        op.create_index(name, table, columns, **kw)
+
+
+def drop_index_online(name, table):
+    if is_postgres():
+        with op.get_context().autocommit_block():
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+    else:
+        op.drop_index(name, table_name=table)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 1. Merge duplicated stock rows into the oldest one, or the unique index can't be built
+    op.execute("""
+        UPDATE inventory SET quantity = dup.total
+        FROM (
+            SELECT MIN(id) AS keep_id, SUM(COALESCE(quantity, 0)) AS total
+            FROM inventory
+            GROUP BY user_id, menu_item_id
+            HAVING COUNT(*) > 1
+        ) AS dup
+        WHERE inventory.id = dup.keep_id
+    """)
+    op.execute("""
+        DELETE FROM inventory
+        WHERE id NOT IN (SELECT MIN(id) FROM inventory GROUP BY user_id, menu_item_id)
+    """)
+
+    # 2. Unique (user_id, menu_item_id), built without locking writes
+    create_index_online('uq_inventory_user_menu_item', 'inventory', ['user_id', 'menu_item_id'], unique=True)
+    if is_postgres():
+        op.execute(
+            "ALTER TABLE inventory ADD CONSTRAINT uq_inventory_user_menu_item "
+            "UNIQUE USING INDEX uq_inventory_user_menu_item"
+        )
+
+    # 3. Composite and partial indexes of the hot queries
+    create_index_online(
+        'ix_gamelog_user_id_timestamp', 'gamelog',
+        ['user_id', sa.text('timestamp DESC'), sa.text('id DESC')]
+    )
+    create_index_online('ix_orders_user_status_created', 'orders', ['user_id', 'status', 'created_at'])
+    create_index_online(
+        'ix_orders_pending_created', 'orders', ['created_at'],
+        postgresql_where=PENDING, sqlite_where=PENDING
+    )
+    create_index_online(op.f('ix_order_items_order_id'), 'order_items', ['order_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_online(op.f('ix_order_items_order_id'), 'order_items')
+    drop_index_online('ix_orders_pending_created', 'orders')
+    drop_index_online('ix_orders_user_status_created', 'orders')
+    drop_index_online('ix_gamelog_user_id_timestamp', 'gamelog')
+    if is_postgres():
+        op.drop_constraint('uq_inventory_user_menu_item', 'inventory', type_='unique')
+    else:
+        op.drop_index('uq_inventory_user_menu_item', table_name='inventory')
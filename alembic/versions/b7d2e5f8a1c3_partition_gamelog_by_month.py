@@ -0,0 +1,120 @@
+"""partition gamelog by month
+
+Revision ID: b7d2e5f8a1c3
+Revises: a3f1c9d2e4b7
+Create Date: 2026-10-17 14:03:51.227904
+
+Converts gamelog into a table range-partitioned by month on timestamp
+(PostgreSQL only, SQLite keeps the plain table). Monthly partitions are created
+for the existing rows and the next months, plus a DEFAULT partition so an insert
+never fails when the maintenance command (`python manage.py partitions`) is late.
+The rows are copied into the new table: run it in a maintenance window, the
+table is locked during the copy.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2e5f8a1c3'
+down_revision: Union[str, Sequence[str], None] = 'a3f1c9d2e4b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+MONTHS_AHEAD = 3
+
+COLUMNS = "id, user_id, action_type, message, amount, timestamp"
+
+
+def is_postgres() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not is_postgres():
+        return
+
+    # 1. Move the current table aside (index names are global to the schema)
+    op.execute("ALTER TABLE gamelog RENAME TO gamelog_unpartitioned")
+    op.execute("ALTER TABLE gamelog_unpartitioned RENAME CONSTRAINT gamelog_pkey TO gamelog_unpartitioned_pkey")
+    op.execute("ALTER INDEX ix_gamelog_id RENAME TO ix_gamelog_unpartitioned_id")
+    op.execute("ALTER INDEX ix_gamelog_user_id_timestamp RENAME TO ix_gamelog_unpartitioned_user_id_timestamp")
+
+    # 2. Partitioned table: the partition key must be part of the primary key
+    op.execute("""
+        CREATE TABLE gamelog (
+            id INTEGER NOT NULL DEFAULT nextval('gamelog_id_seq'),
+            user_id INTEGER REFERENCES users (id),
+            action_type VARCHAR,
+            message VARCHAR,
+            amount NUMERIC(10, 2),
+            timestamp TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            CONSTRAINT gamelog_pkey PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """)
+    op.execute("ALTER SEQUENCE gamelog_id_seq OWNED BY gamelog.id")
+    op.execute("CREATE INDEX ix_gamelog_user_id_timestamp ON gamelog (user_id, timestamp DESC, id DESC)")
+    op.execute("CREATE TABLE gamelog_default PARTITION OF gamelog DEFAULT")
+
+    # 3. One partition per month, from the oldest log to a few months ahead
+    op.execute(f"""
+        DO $$
+        DECLARE
+            partition_start TIMESTAMPTZ;
+        BEGIN
+            FOR partition_start IN
+                SELECT generate_series(
+                    date_trunc('month', COALESCE(MIN(timestamp), now()), 'UTC'),
+                    date_trunc('month', now(), 'UTC') + interval '{MONTHS_AHEAD} months',
+                    interval '1 month'
+                )
+                FROM gamelog_unpartitioned
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF gamelog FOR VALUES FROM (%L) TO (%L)',
+                    'gamelog_' || to_char(partition_start AT TIME ZONE 'UTC', '"y"YYYY"m"MM'),
+                    partition_start,
+                    partition_start + interval '1 month'
+                );
+            END LOOP;
+        END $$
+    """)
+
+    # 4. Copy the rows, then drop the old table
+    op.execute(f"INSERT INTO gamelog ({COLUMNS}) SELECT {COLUMNS} FROM gamelog_unpartitioned")
+    op.execute("DROP TABLE gamelog_unpartitioned")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not is_postgres():
+        return
+
+    op.execute("ALTER TABLE gamelog RENAME TO gamelog_partitioned")
+    op.execute("ALTER TABLE gamelog_partitioned RENAME CONSTRAINT gamelog_pkey TO gamelog_partitioned_pkey")
+    op.execute("ALTER INDEX ix_gamelog_user_id_timestamp RENAME TO ix_gamelog_partitioned_user_id_timestamp")
+
+    op.create_table('gamelog',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('gamelog_id_seq')"), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('action_type', sa.String(), nullable=True),
+    sa.Column('message', sa.String(), nullable=True),
+    sa.Column('amount', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('timestamp', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id', name='gamelog_pkey')
+    )
+    op.execute("ALTER SEQUENCE gamelog_id_seq OWNED BY gamelog.id")
+    op.create_index(op.f('ix_gamelog_id'), 'gamelog', ['id'], unique=False)
+    op.execute(
+        "CREATE INDEX ix_gamelog_user_id_timestamp ON gamelog (user_id, timestamp DESC, id DESC)"
+    )
+
+    # Archived (detached) partitions are not copied back
+    op.execute(f"INSERT INTO gamelog ({COLUMNS}) SELECT {COLUMNS} FROM gamelog_partitioned")
+    op.execute("DROP TABLE gamelog_partitioned")
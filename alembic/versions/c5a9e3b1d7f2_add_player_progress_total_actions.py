@@ -0,0 +1,42 @@
+"""add player_progress total_actions
+
+Revision ID: c5a9e3b1d7f2
+Revises: b7d2e5f8a1c3
+Create Date: 2026-10-17 15:26:08.713542
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5a9e3b1d7f2'
+down_revision: Union[str, Sequence[str], None] = 'b7d2e5f8a1c3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'player_progress',
+        sa.Column('total_actions', sa.Integer(), server_default='0', nullable=False)
+    )
+
+    # Count the logs already written
+    op.execute("""
+        UPDATE player_progress SET total_actions = logs.total
+        FROM (
+            SELECT user_id, COUNT(*) AS total
+            FROM gamelog
+            GROUP BY user_id
+        ) AS logs
+        WHERE player_progress.user_id = logs.user_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('player_progress', 'total_actions')
@@ -0,0 +1,51 @@
+"""add order_items unit_price and menu_item_name
+
+Revision ID: c9f3b7e1a5d8
+Revises: b4e8a2c6d0f3
+Create Date: 2026-10-17 20:31:45.208736
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9f3b7e1a5d8'
+down_revision: Union[str, Sequence[str], None] = 'b4e8a2c6d0f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLES = ('order_items', 'order_items_archive')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in TABLES:
+        op.add_column(table, sa.Column('unit_price', sa.Numeric(precision=10, scale=2), nullable=True))
+        op.add_column(table, sa.Column('menu_item_name', sa.String(), nullable=True))
+
+        # Existing lines take the current menu prices
+        op.execute(f"""
+            UPDATE {table} SET unit_price = menu_items.selling_price, menu_item_name = menu_items.name
+            FROM menu_items
+            WHERE {table}.menu_item_id = menu_items.id
+        """)
+        op.execute(f"""
+            UPDATE {table} SET unit_price = COALESCE(unit_price, 0), menu_item_name = COALESCE(menu_item_name, 'Unknown')
+            WHERE unit_price IS NULL OR menu_item_name IS NULL
+        """)
+
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('unit_price', existing_type=sa.Numeric(precision=10, scale=2), nullable=False)
+            batch_op.alter_column('menu_item_name', existing_type=sa.String(), nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('menu_item_name')
+            batch_op.drop_column('unit_price')
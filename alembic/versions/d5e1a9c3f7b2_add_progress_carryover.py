@@ -0,0 +1,38 @@
+"""add progress_carryover
+
+Revision ID: d5e1a9c3f7b2
+Revises: c9f3b7e1a5d8
+Create Date: 2026-10-17 22:05:12.418903
+
+Filled by `python manage.py partitions` before it drops a gamelog partition.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5e1a9c3f7b2'
+down_revision: Union[str, Sequence[str], None] = 'c9f3b7e1a5d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('progress_carryover',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('money_earned', sa.Numeric(precision=12, scale=2), server_default='0.00', nullable=False),
+    sa.Column('money_spent', sa.Numeric(precision=12, scale=2), server_default='0.00', nullable=False),
+    sa.Column('orders', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('actions', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('progress_carryover')
@@ -0,0 +1,39 @@
+"""add player_daily_stats
+
+Revision ID: d8b4f2a6c0e9
+Revises: c5a9e3b1d7f2
+Create Date: 2026-10-17 16:41:27.094316
+
+Fill it from the existing logs with `python manage.py backfill-daily-stats`.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8b4f2a6c0e9'
+down_revision: Union[str, Sequence[str], None] = 'c5a9e3b1d7f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('player_daily_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('money_earned', sa.Numeric(precision=12, scale=2), server_default='0.00', nullable=False),
+    sa.Column('money_spent', sa.Numeric(precision=12, scale=2), server_default='0.00', nullable=False),
+    sa.Column('orders_completed', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('orders_cancelled', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'day')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('player_daily_stats')
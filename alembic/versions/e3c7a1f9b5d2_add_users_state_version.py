@@ -0,0 +1,31 @@
+"""add users state_version
+
+Revision ID: e3c7a1f9b5d2
+Revises: d8b4f2a6c0e9
+Create Date: 2026-10-17 18:02:51.336904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3c7a1f9b5d2'
+down_revision: Union[str, Sequence[str], None] = 'd8b4f2a6c0e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'users',
+        sa.Column('state_version', sa.Integer(), server_default='0', nullable=False)
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'state_version')
@@ -0,0 +1,52 @@
+"""add orders keyset indexes
+
+Revision ID: f1a8d3c6b9e4
+Revises: e3c7a1f9b5d2
+Create Date: 2026-10-17 18:47:12.604219
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1a8d3c6b9e4'
+down_revision: Union[str, Sequence[str], None] = 'e3c7a1f9b5d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def is_postgres() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def create_index_online(name, table, columns, **kw):
+    """CREATE INDEX CONCURRENTLY on Postgres (outside the migration transaction), plain elsewhere."""
+    if is_postgres():
+        with op.get_context().autocommit_block():
+            op.create_index(name, table, columns, postgresql_concurrently=True, **kw)
+    else:
+        op.create_index(name, table, columns, **kw)
+
+
+def drop_index_online(name, table):
+    if is_postgres():
+        with op.get_context().autocommit_block():
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+    else:
+        op.drop_index(name, table_name=table)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # /admin/orders keyset pages on (created_at, id), unfiltered or by status
+    create_index_online('ix_orders_created_id', 'orders', ['created_at', 'id'])
+    create_index_online('ix_orders_status_created_id', 'orders', ['status', 'created_at', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_online('ix_orders_status_created_id', 'orders')
+    drop_index_online('ix_orders_created_id', 'orders')
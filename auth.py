@@ -1,3 +1,8 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import bcrypt
 from jose import jwt
 from datetime import datetime, timedelta, timezone
@@ -24,6 +29,99 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     hashed_bytes = hashed_password.encode('utf-8')
     return bcrypt.checkpw(password_bytes, hashed_bytes)
 
+# ----------------------
+# PASSWORD POOL
+# bcrypt releases the GIL, so a dedicated thread pool runs hashes in parallel
+# without holding a slot of the request threadpool.
+# ----------------------
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", "4"))
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", "32"))
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when the password pool already has its maximum of jobs waiting."""
+
+
+class PasswordPool:
+    """Bounded pool for bcrypt work: at most `workers + queue_limit` jobs in flight."""
+
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.completed = 0
+            self.rejected = 0
+            self.in_flight = 0
+            self.total_latency = 0.0
+            self.max_latency = 0.0
+            self.total_queue_wait = 0.0
+            self.max_queue_wait = 0.0
+
+    async def run(self, fn, *args):
+        """Runs fn(*args) on the pool. Raises PasswordPoolBusy instead of queueing past the limit."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordPoolBusy()
+
+        submitted_at = time.perf_counter()
+        with self._lock:
+            self.in_flight += 1
+
+        def job():
+            started_at = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                self._record(started_at - submitted_at, time.perf_counter() - started_at)
+
+        # The slot is freed when the hash is done, even if the client went away
+        future = self._executor.submit(job)
+        future.add_done_callback(lambda _: self._slots.release())
+        return await asyncio.wrap_future(future)
+
+    def _record(self, queue_wait: float, latency: float):
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+            self.total_queue_wait += queue_wait
+            self.max_queue_wait = max(self.max_queue_wait, queue_wait)
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def stats(self) -> dict:
+        with self._lock:
+            done = self.completed or 1
+            return {
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_hash_ms": round(self.total_latency / done * 1000, 2),
+                "max_hash_ms": round(self.max_latency * 1000, 2),
+                "avg_queue_wait_ms": round(self.total_queue_wait / done * 1000, 2),
+                "max_queue_wait_ms": round(self.max_queue_wait * 1000, 2),
+            }
+
+
+password_pool = PasswordPool(PASSWORD_WORKERS, PASSWORD_QUEUE_LIMIT)
+
+
+async def hash_password_async(password: str) -> str:
+    """hash_password, run on the password pool."""
+    return await password_pool.run(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password, run on the password pool."""
+    return await password_pool.run(verify_password, plain_password, hashed_password)
+
 def create_access_token(data: dict) -> str:
     """
     Create a JWT token.
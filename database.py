@@ -1,8 +1,10 @@
 import os
 from dotenv import load_dotenv
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import Connection, create_engine
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 # Load the .env file
 load_dotenv()
@@ -13,6 +15,9 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL is not set")
 
+# Serve the gameplay routes with async handlers on an async engine
+ASYNC_DB = os.getenv("ASYNC_DB", "false").lower() == "true"
+
 # Creating the SQLAlchemy engine
 engine = create_engine(DATABASE_URL)
 
@@ -33,3 +38,61 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def dialect_insert(db: Session | Connection, model):
+    """INSERT of the session's (or connection's) dialect, which supports ON CONFLICT upserts (PostgreSQL and SQLite)."""
+    dialect = db.get_bind().dialect if isinstance(db, Session) else db.dialect
+    if dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
+# ----------------------
+# ASYNC ENGINE
+# ----------------------
+def to_async_url(url: str) -> str:
+    """Swaps the blocking driver of a DB URL for its asyncio equivalent."""
+    if url.startswith(("postgresql://", "postgresql+psycopg2://", "postgres://")):
+        return "postgresql+asyncpg://" + url.split("://", 1)[1]
+    if url.startswith(("sqlite://", "sqlite+pysqlite://")):
+        return "sqlite+aiosqlite://" + url.split("://", 1)[1]
+    return url
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+# Created on first use: the async driver is only required when the async mode is on
+async_engine = None
+AsyncSessionLocal = None
+
+
+def get_async_sessionmaker():
+    global async_engine, AsyncSessionLocal
+    if AsyncSessionLocal is None:
+        async_engine = create_async_engine(ASYNC_DATABASE_URL)
+        # Objects stay readable after commit: an expired attribute can't lazy load outside the greenlet
+        AsyncSessionLocal = async_sessionmaker(
+            bind=async_engine,
+            autoflush=False,
+            expire_on_commit=False,
+        )
+    return AsyncSessionLocal
+
+
+# Dependency FastAPI (async mode)
+async def get_async_db():
+    db = get_async_sessionmaker()()
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+async def run_sync(db: AsyncSession, fn, *args, **kwargs):
+    """
+    Runs a sync route body on the async session.
+    The ORM code is shared with the sync routes, but every DB round trip
+    goes through the async driver instead of holding a threadpool thread.
+    """
+    return await db.run_sync(lambda session: fn(*args, db=session, **kwargs))
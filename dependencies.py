@@ -1,18 +1,39 @@
+from dataclasses import dataclass
+import time
+
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db
+from database import get_db, get_async_db
 import models
 from auth import decode_access_token
+from cache import user_cache, token_cache
 
 security = HTTPBearer()
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-):
-    token = credentials.credentials
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """
+    Identity of the authenticated user, cached between requests.
+    It holds no balance: routes that read or spend money reload (and lock) the users row.
+    """
+    id: int
+    username: str
+    is_admin: bool
+
+    @classmethod
+    def from_model(cls, user: models.User) -> "CurrentUser":
+        return cls(id=user.id, username=user.username, is_admin=user.is_admin)
+
+
+def _user_id_from_token(token: str) -> int:
+    user_id = token_cache.get(token)
+    if user_id is not None:
+        return user_id
+
     try:
         payload = decode_access_token(token)
     except Exception:
@@ -22,16 +43,63 @@ def get_current_user(
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+    # Never keep a token in cache past its expiry
+    token_cache.set(token, user_id, ttl=payload["exp"] - time.time())
+    return user_id
+
+def invalidate_user(user_id: int):
+    """Drops the cached identity; call it after a user is updated or deleted."""
+    user_cache.invalidate(user_id)
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> CurrentUser:
+    user_id = _user_id_from_token(credentials.credentials)
+
+    current_user = user_cache.get(user_id)
+    if current_user:
+        return current_user
+
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
-    return user
+
+    current_user = CurrentUser.from_model(user)
+    user_cache.set(user_id, current_user)
+    return current_user
 
 def get_current_admin(
-    current_user: models.User = Depends(get_current_user)
-):
+    current_user: CurrentUser = Depends(get_current_user)
+) -> CurrentUser:
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Access denied: You must be an admin")
     return current_user
 
+# ----------------------
+# ASYNC MODE
+# ----------------------
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> CurrentUser:
+    user_id = _user_id_from_token(credentials.credentials)
+
+    current_user = user_cache.get(user_id)
+    if current_user:
+        return current_user
+
+    user = await db.get(models.User, user_id)
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+
+    current_user = CurrentUser.from_model(user)
+    user_cache.set(user_id, current_user)
+    return current_user
 
+async def get_current_admin_async(
+    current_user: CurrentUser = Depends(get_current_user_async)
+) -> CurrentUser:
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Access denied: You must be an admin")
+    return current_user
@@ -0,0 +1,32 @@
+from fastapi import Request, Response
+
+# Cache-Control of the conditional reads
+MENU_CACHE_CONTROL = "private, max-age=30"
+PLAYER_CACHE_CONTROL = "private, no-cache"
+
+
+def weak_etag(*parts) -> str:
+    return 'W/"' + "-".join(str(part) for part in parts) + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match uses the weak comparison: W/ prefixes are ignored."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def conditional_response(request: Request, response: Response, etag: str, cache_control: str) -> Response | None:
+    """
+    Sets the validators on the response; returns a bodyless 304 to send instead
+    when the client already has this version, None when the body must be built.
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
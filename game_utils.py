@@ -1,8 +1,204 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from sqlalchemy import event, func, insert, select, update
+from sqlalchemy.engine import Connection
 from sqlalchemy.orm import Session
 from decimal import Decimal
+from database import dialect_insert
+from levels import level_curve
+from leaderboard import leaderboard
+import gamelog_writer
 import models
 
 
+def compute_level(total_money_earned: Decimal, total_orders: int) -> int:
+    """Level reached for the given lifetime totals (thresholds from levels.json)."""
+    return level_curve.level_for(total_money_earned, total_orders)
+
+
+# ----------------
+# GameJournal : the logs and progress changes of the current transaction
+# ------------------------
+@dataclass
+class ProgressDelta:
+    money_earned: Decimal = Decimal("0.00")
+    money_spent: Decimal = Decimal("0.00")
+    orders: int = 0
+    orders_cancelled: int = 0
+    actions: int = 0
+
+
+class GameJournal:
+    """
+    Collects the GameLog rows and PlayerProgress deltas of a transaction.
+    Nothing is written until commit, where flush() issues one bulk insert of
+    the logs, one upsert of the progress rows and one of the daily stats rows,
+    whatever the number of actions.
+    """
+
+    def __init__(self):
+        self.logs: list[dict] = []
+        self.progress: dict[int, ProgressDelta] = {}
+
+    def add(self, user_id: int, action_type: str, message: str, amount: Decimal = None):
+        self.logs.append({
+            "user_id": user_id,
+            "action_type": action_type,
+            "message": message,
+            "amount": amount
+        })
+
+        # Update stats based on the type of action
+        delta = self.progress.setdefault(user_id, ProgressDelta())
+        delta.actions += 1
+        if action_type == "order_completed" and amount:
+            delta.money_earned += amount
+            delta.orders += 1
+        elif action_type == "restock" and amount:
+            delta.money_spent += abs(amount)
+        elif action_type == "order_cancelled":
+            delta.orders_cancelled += 1
+
+    def flush(self, db: Session):
+        if self.progress:
+            # Same lock order as the routes moving money: users rows first, then the
+            # progress and daily stats rows, every table in ascending user id
+            self.progress = dict(sorted(self.progress.items()))
+            user_ids = list(self.progress)
+            if len(user_ids) > 1:
+                db.execute(
+                    select(models.User.id)
+                    .where(models.User.id.in_(user_ids))
+                    .order_by(models.User.id)
+                    .with_for_update()
+                )
+            bump_state_version(db, user_ids)
+            self._flush_progress(db)
+            self._flush_daily_stats(db)
+        logs = self.logs
+        if gamelog_writer.writer.running:
+            # Informational logs are handed to the write-behind queue once committed
+            # (not in the CLI commands: nothing would flush it)
+            db.info["deferred_logs"] = [log for log in logs if gamelog_writer.is_write_behind(log)]
+            logs = [log for log in logs if not gamelog_writer.is_write_behind(log)]
+        if logs:
+            db.execute(insert(models.GameLog), logs)
+
+    def _flush_progress(self, db: Session):
+        progress = models.PlayerProgress
+        stmt = dialect_insert(db, progress).values([
+            {"user_id": user_id,
+             "total_money_earned": delta.money_earned,
+             "total_money_spent": delta.money_spent,
+             "total_orders": delta.orders,
+             "total_actions": delta.actions,
+             "current_level": 1}
+            for user_id, delta in self.progress.items()
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[progress.user_id],
+            set_={
+                "total_money_earned": func.coalesce(progress.total_money_earned, 0) + stmt.excluded.total_money_earned,
+                "total_money_spent": func.coalesce(progress.total_money_spent, 0) + stmt.excluded.total_money_spent,
+                "total_orders": func.coalesce(progress.total_orders, 0) + stmt.excluded.total_orders,
+                "total_actions": progress.total_actions + stmt.excluded.total_actions,
+            }
+        ).returning(progress.user_id, progress.total_money_earned, progress.total_orders, progress.current_level)
+
+        # The level is computed once per player, from the new totals
+        rows = db.execute(stmt).all()
+        ranked = []
+        for row in rows:
+            level = compute_level(row.total_money_earned, row.total_orders)
+            ranked.append((row.user_id, row.total_money_earned, max(level, row.current_level or 1)))
+            if level > (row.current_level or 1):
+                db.execute(
+                    update(progress)
+                    .where(progress.user_id == row.user_id)
+                    .values(current_level=level, total_actions=progress.total_actions + 1)
+                )
+                self.logs.append({
+                    "user_id": row.user_id,
+                    "action_type": "level_up",
+                    "message": f"Congrats! Level {level} achieved !",
+                    "amount": None
+                })
+
+        # New totals for the leaderboard, applied once committed (names of its new players in one query)
+        names = {}
+        unknown = [user_id for user_id, _, _ in ranked if leaderboard.warmed and not leaderboard.knows(user_id)]
+        if unknown:
+            names = dict(db.execute(
+                select(models.User.id, models.User.username).where(models.User.id.in_(unknown))
+            ).all())
+        db.info["leaderboard_updates"] = [
+            (user_id, money_earned, level, names.get(user_id))
+            for user_id, money_earned, level in ranked
+        ]
+
+
+    def _flush_daily_stats(self, db: Session):
+        daily = models.PlayerDailyStats
+        today = datetime.now(timezone.utc).date()
+        rows = [
+            {"user_id": user_id,
+             "day": today,
+             "money_earned": delta.money_earned,
+             "money_spent": delta.money_spent,
+             "orders_completed": delta.orders,
+             "orders_cancelled": delta.orders_cancelled}
+            for user_id, delta in self.progress.items()
+            if delta.money_earned or delta.money_spent or delta.orders or delta.orders_cancelled
+        ]
+        if not rows:
+            return
+
+        stmt = dialect_insert(db, daily).values(rows)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[daily.user_id, daily.day],
+            set_={
+                "money_earned": daily.money_earned + stmt.excluded.money_earned,
+                "money_spent": daily.money_spent + stmt.excluded.money_spent,
+                "orders_completed": daily.orders_completed + stmt.excluded.orders_completed,
+                "orders_cancelled": daily.orders_cancelled + stmt.excluded.orders_cancelled,
+            }
+        ))
+
+
+def get_journal(db: Session) -> GameJournal:
+    """The journal of the session's current transaction."""
+    return db.info.setdefault("game_journal", GameJournal())
+
+
+@event.listens_for(Session, "before_commit")
+def flush_journal(session: Session):
+    journal = session.info.pop("game_journal", None)
+    if journal:
+        journal.flush(session)
+
+
+@event.listens_for(Session, "after_commit")
+def queue_deferred_logs(session: Session):
+    deferred_logs = session.info.pop("deferred_logs", None)
+    if deferred_logs:
+        gamelog_writer.writer.put(deferred_logs)
+
+
+@event.listens_for(Session, "after_commit")
+def update_leaderboard(session: Session):
+    for user_id, money_earned, level, username in session.info.pop("leaderboard_updates", ()):
+        leaderboard.update(user_id, money_earned, level, username)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def drop_journal(session: Session, transaction):
+    # Rolled back (or closed): forget what the transaction logged
+    if transaction.parent is None:
+        session.info.pop("game_journal", None)
+        session.info.pop("deferred_logs", None)
+        session.info.pop("leaderboard_updates", None)
+
+
 def log_action(
         db: Session,
         user_id: int,
@@ -10,64 +206,15 @@ def log_action(
         message: str,
         amount: Decimal  = None
 ):
-    """Records an action in the GameLog and updates PlayerProgress.."""
-
-    # 1. Create the log
-    db_gameLog = models.GameLog(
-        user_id=user_id,
-        action_type=action_type,
-        message=message,
-        amount=amount
-    )
-    db.add(db_gameLog)
-
-    # 2. Retrieve or create PlayerProgress
-    progress = db.query(models.PlayerProgress).filter(
-        models.PlayerProgress.user_id == user_id
-    ).first()
-
-    if not progress:
-        # Create a new PlayerProgress with all the values
-        progress = models.PlayerProgress(
-            user_id=user_id,
-            total_money_earned=Decimal("0.00"),
-            total_orders=0,
-            current_level=1,
-            total_money_spent=Decimal("0.00")
-        )
-        db.add(progress)
-        db.flush()  # Force immediate creation
-
-    # 3. Update stats based on the type of action
-    if action_type == "order_client" and amount:
-        progress.total_money_earned += amount
-        progress.total_orders += 1
-
-    elif action_type == "restock" and amount:
-        progress.total_money_spent += abs(amount)
-
-    # 4. Calculate the level
-    old_level = progress.current_level
-
-    if progress.total_money_earned >= 10000 and progress.total_orders >= 1000:
-        progress.current_level = 5
-    elif progress.total_money_earned >= 2000 and progress.total_orders >= 200:
-        progress.current_level = 4
-    elif progress.total_money_earned >= 500 and progress.total_orders >= 50:
-        progress.current_level = 3
-    elif progress.total_money_earned >= 100 and progress.total_orders >= 10:
-        progress.current_level = 2
-    else:
-        progress.current_level = 1
-
-    # If the level has risen, log it
-    if progress.current_level > old_level:
-        level_up_log = models.GameLog(
-            user_id=user_id,
-            action_type="level_up",
-            message=f"Congrats! Level {progress.current_level} achieved !",
-            amount=None
-        )
-        db.add(level_up_log)
+    """Records an action in the GameLog and updates PlayerProgress (both written at commit)."""
+    get_journal(db).add(user_id, action_type, message, amount)
 
 
+def bump_state_version(db: Session | Connection, user_ids):
+    """Marks the players' money, inventory and progress as changed (new ETags). `user_ids`: ids or a SELECT."""
+    db.execute(
+        update(models.User)
+        .where(models.User.id.in_(user_ids))
+        .values(state_version=models.User.state_version + 1)
+        .execution_options(synchronize_session=False)
+    )
@@ -0,0 +1,183 @@
+import asyncio
+import csv
+import io
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime, timezone
+
+from sqlalchemy import insert
+
+import models
+from database import engine as default_engine
+
+logger = logging.getLogger(__name__)
+
+# Informational logs: no amount, they don't move PlayerProgress
+WRITE_BEHIND_ACTIONS = {"order_created", "order_cancelled", "order_completed"}
+
+COPY_COLUMNS = ("user_id", "action_type", "message", "amount", "timestamp")
+
+
+def is_write_behind(log: dict) -> bool:
+    """Whether a GameLog row can leave the business transaction."""
+    return log["action_type"] in WRITE_BEHIND_ACTIONS and log.get("amount") is None
+
+
+# ----------------------
+# GameLogWriter : write-behind queue of the informational logs
+# ----------------------
+class GameLogWriter:
+    """
+    Bounded in-process queue of GameLog rows, written in batches by a background
+    task (COPY on Postgres/psycopg2, multi-row INSERT elsewhere).
+    Rows are queued once their transaction has committed; when the queue is full
+    the oldest queued rows are dropped (and counted), so memory stays bounded and
+    a request never waits for the database. Rows dropped, or still queued when the
+    process crashes, are lost: only informational logs go through here, the
+    financial ones stay in the transaction.
+    """
+
+    def __init__(self, enabled: bool, queue_size: int, batch_size: int, interval: float, engine=None):
+        self.enabled = enabled
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.interval = interval
+        self.engine = engine or default_engine
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._task = None
+        self._loop = None
+        self._wake = None
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.failures = 0
+
+    @property
+    def running(self) -> bool:
+        """Whether the background task is flushing the queue (only then can logs be deferred)."""
+        return self._task is not None
+
+    def put(self, rows: list[dict]):
+        """Queues committed rows. When the queue is full, the oldest rows make room."""
+        now = datetime.now(timezone.utc)
+        rows = [{**row, "timestamp": now} for row in rows]
+
+        with self._lock:
+            overflow = len(self._queue) + len(rows) - self.queue_size
+            if overflow > 0:
+                dropped = min(overflow, len(self._queue))
+                for _ in range(dropped):
+                    self._queue.popleft()
+                rows = rows[overflow - dropped:]
+                self.dropped += overflow
+            self._queue.extend(rows)
+            full_batch = len(self._queue) >= self.batch_size
+
+        if overflow > 0:
+            logger.warning("GameLog queue full, %s oldest rows dropped", overflow)
+        if full_batch and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def _take(self) -> list[dict]:
+        with self._lock:
+            count = min(self.batch_size, len(self._queue))
+            return [self._queue.popleft() for _ in range(count)]
+
+    def flush(self):
+        """Writes every queued row, one batch at a time."""
+        while batch := self._take():
+            try:
+                self.write(batch)
+            except Exception:
+                self.failures += 1
+                logger.exception("GameLog batch of %s rows failed, requeued", len(batch))
+                with self._lock:
+                    # Back in front of the queue, within its bound: rows queued meanwhile take precedence
+                    room = max(self.queue_size - len(self._queue), 0)
+                    requeued = batch[len(batch) - room:] if room < len(batch) else batch
+                    self._queue.extendleft(reversed(requeued))
+                    self.dropped += len(batch) - len(requeued)
+                return
+
+    def write(self, rows: list[dict]):
+        with self.engine.begin() as conn:
+            if conn.dialect.driver == "psycopg2":
+                copy_rows(conn, rows)
+            else:
+                conn.execute(insert(models.GameLog), rows)
+        self.written += len(rows)
+        self.batches += 1
+
+    # ----------------------
+    # Background task (FastAPI lifespan)
+    # ----------------------
+    async def start(self):
+        if not self.enabled or self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await asyncio.to_thread(self.flush)
+
+    async def stop(self):
+        """Stops the background task and drains the queue."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._loop = None
+        await asyncio.to_thread(self.flush)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "queued": len(self._queue),
+            "queue_size": self.queue_size,
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "failures": self.failures
+        }
+
+
+def copy_rows(conn, rows: list[dict]):
+    """COPY the rows into gamelog through the psycopg2 connection of `conn`."""
+    buffer = io.StringIO()
+    csv_writer = csv.writer(buffer)
+    for row in rows:
+        csv_writer.writerow([
+            "" if row.get(column) is None else row[column]
+            for column in COPY_COLUMNS
+        ])
+    buffer.seek(0)
+
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY gamelog ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+    finally:
+        cursor.close()
+
+
+writer = GameLogWriter(
+    enabled=os.getenv("GAMELOG_WRITE_BEHIND", "false").lower() == "true",
+    queue_size=int(os.getenv("GAMELOG_QUEUE_SIZE", "10000")),
+    batch_size=int(os.getenv("GAMELOG_BATCH_SIZE", "500")),
+    interval=float(os.getenv("GAMELOG_FLUSH_INTERVAL", "1.0")),
+)
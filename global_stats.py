@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+import models
+from database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two refreshes of the admin stats snapshot
+REFRESH_INTERVAL = float(os.getenv("ADMIN_STATS_REFRESH_INTERVAL", "60"))
+
+
+def compute_global_stats(db: Session) -> dict:
+    """All the global counters in one round trip: FILTER aggregates on users, scalar subqueries for the rest."""
+    user = models.User
+    row = db.execute(
+        select(
+            func.count().label("users"),
+            func.count().filter(user.is_admin == True).label("admins"),
+            func.coalesce(func.sum(user.money), 0).label("money"),
+            select(func.count()).select_from(models.MenuItem).scalar_subquery().label("menu_items"),
+            select(func.count()).select_from(models.Order).scalar_subquery().label("orders")
+        ).select_from(user)
+    ).one()
+
+    return {
+        "users": {
+            "total": row.users,
+            "admins": row.admins,
+            "players": row.users - row.admins
+        },
+        "game": {
+            "total_menu_items": row.menu_items,
+            "total_orders": row.orders,
+            "total_money_in_game": round(row.money, 2)
+        },
+        "generated_at": datetime.now(timezone.utc)
+    }
+
+
+# ----------------------
+# GlobalStats : snapshot of the admin stats
+# ----------------------
+class GlobalStats:
+    """
+    Last result of compute_global_stats, refreshed by a background task.
+    A read recomputes it only when asked to, or when the snapshot is missing
+    or older than twice the refresh interval (refresh task not running).
+    """
+
+    def __init__(self, interval: float = REFRESH_INTERVAL):
+        self.interval = interval
+        self._snapshot = None
+        self._computed_at = 0.0
+        self._lock = threading.Lock()
+        self._task = None
+
+    def get(self, db: Session, fresh: bool = False) -> dict:
+        with self._lock:
+            snapshot = self._snapshot
+            stale = time.monotonic() - self._computed_at > 2 * self.interval
+        if fresh or snapshot is None or stale:
+            snapshot = self.refresh(db)
+        return snapshot
+
+    def refresh(self, db: Session) -> dict:
+        snapshot = compute_global_stats(db)
+        with self._lock:
+            self._snapshot = snapshot
+            self._computed_at = time.monotonic()
+        return snapshot
+
+    def reload(self):
+        with SessionLocal() as db:
+            self.refresh(db)
+
+    def clear(self):
+        with self._lock:
+            self._snapshot = None
+            self._computed_at = 0.0
+
+    # ---------- background refresh (FastAPI lifespan) ----------
+    async def start(self):
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.reload)
+            except Exception:
+                logger.exception("Admin stats refresh failed")
+            await asyncio.sleep(self.interval)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+global_stats = GlobalStats()
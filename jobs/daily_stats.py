@@ -0,0 +1,119 @@
+"""
+Fills player_daily_stats from the GameLog history.
+
+The game journal keeps the rollup up to date from the migration on; this
+command rebuilds the days before it (or any range after a fix), one range of
+user ids per transaction: the rows of the range are deleted, then recomputed
+with one INSERT ... SELECT ... GROUP BY user_id, day.
+
+The days before the oldest log still in gamelog are never touched: once the
+partition retention has dropped old months, their rollup can't be recomputed.
+"""
+import os
+import time
+from datetime import date, datetime, time as day_start, timezone
+
+from sqlalchemy import Date, case, cast, delete, func, select
+from sqlalchemy.engine import Engine
+
+import models
+from database import dialect_insert, engine
+from jobs.rebuild_progress import user_id_ranges
+
+CHUNK_SIZE = int(os.getenv("REBUILD_CHUNK_SIZE", "1000"))
+
+
+def log_day(conn):
+    """UTC day of a log, in SQL."""
+    if conn.dialect.name == "postgresql":
+        return cast(func.timezone("UTC", models.GameLog.timestamp), Date)
+    return func.date(models.GameLog.timestamp)
+
+
+def backfill_range(conn, start: int, end: int, since: date | None) -> int:
+    log = models.GameLog
+    daily = models.PlayerDailyStats
+    order_total = (log.action_type == "order_completed") & (log.amount != 0)
+    restock = (log.action_type == "restock") & (log.amount != 0)
+    day = log_day(conn)
+
+    clear = delete(daily).where(daily.user_id >= start, daily.user_id < end)
+    logs = (
+        select(
+            log.user_id,
+            day.label("day"),
+            func.sum(case((order_total, log.amount), else_=0)),
+            func.sum(case((restock, func.abs(log.amount)), else_=0)),
+            func.sum(case((order_total, 1), else_=0)),
+            func.sum(case((log.action_type == "order_cancelled", 1), else_=0))
+        )
+        .where(
+            log.user_id >= start,
+            log.user_id < end,
+            log.action_type.in_(["order_completed", "restock", "order_cancelled"])
+        )
+        .group_by(log.user_id, day)
+    )
+    if since:
+        clear = clear.where(daily.day >= since)
+        logs = logs.where(log.timestamp >= datetime.combine(since, day_start.min, tzinfo=timezone.utc))
+
+    conn.execute(clear)
+    stmt = dialect_insert(conn, daily).from_select(
+        ["user_id", "day", "money_earned", "money_spent", "orders_completed", "orders_cancelled"],
+        logs
+    )
+    # A row committed meanwhile by the game journal is overwritten with the recomputed totals
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[daily.user_id, daily.day],
+        set_={
+            "money_earned": stmt.excluded.money_earned,
+            "money_spent": stmt.excluded.money_spent,
+            "orders_completed": stmt.excluded.orders_completed,
+            "orders_cancelled": stmt.excluded.orders_cancelled,
+        }
+    )
+    return conn.execute(stmt).rowcount
+
+
+def oldest_log_day(conn) -> date | None:
+    """UTC day of the oldest log still in gamelog."""
+    oldest = conn.scalar(select(func.min(models.GameLog.timestamp)))
+    if oldest is None:
+        return None
+    if oldest.tzinfo is not None:
+        oldest = oldest.astimezone(timezone.utc)
+    return oldest.date()
+
+
+def backfill(chunk_size: int = CHUNK_SIZE, since: date | None = None, bind: Engine | None = None) -> int:
+    """
+    Rebuilds the daily stats (from `since` on, or all of them) on `bind`, the
+    application's engine by default. Returns the number of rows written.
+    """
+    bind = bind or engine
+    with bind.connect() as conn:
+        first_day = oldest_log_day(conn)
+    if first_day is None:
+        return 0
+    since = max(since, first_day) if since else first_day
+
+    rows = 0
+    for start, end in user_id_ranges(chunk_size, bind):
+        with bind.begin() as conn:
+            rows += backfill_range(conn, start, end, since)
+    return rows
+
+
+def run(args) -> int:
+    started = time.perf_counter()
+    rows = backfill(args.chunk_size, args.since)
+    print(f"{rows} daily stats row(s) written in {time.perf_counter() - started:.3f}s")
+    return 0
+
+
+def add_arguments(parser):
+    parser.add_argument("--since", type=date.fromisoformat, default=None,
+                        help="first day to rebuild, YYYY-MM-DD (default: the oldest day still in gamelog)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help=f"user ids per transaction (default {CHUNK_SIZE})")
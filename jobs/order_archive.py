@@ -0,0 +1,86 @@
+"""
+Moves finished orders out of the hot tables.
+
+Completed and cancelled orders older than --days are copied, with their
+lines, to orders_archive / order_items_archive, then deleted from orders /
+order_items. One chunk of orders per transaction:
+
+    SELECT id FROM orders WHERE status IN ('COMPLETED', 'CANCELLED') AND created_at < :cutoff
+    ORDER BY created_at LIMIT :n FOR UPDATE SKIP LOCKED
+    INSERT INTO orders_archive SELECT ... / INSERT INTO order_items_archive SELECT ...
+    DELETE FROM order_items ... / DELETE FROM orders ...
+
+read_order falls back to the archive, so an archived order stays readable by its id.
+"""
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, insert, select
+
+import models
+from database import engine
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("ORDER_ARCHIVE_DAYS", "90"))
+CHUNK_SIZE = int(os.getenv("ORDER_ARCHIVE_CHUNK_SIZE", "1000"))
+
+FINISHED = (models.OrderStatus.COMPLETED, models.OrderStatus.CANCELLED)
+
+
+def archive_chunk(conn, cutoff: datetime, chunk_size: int) -> int:
+    """Archives up to `chunk_size` finished orders created before `cutoff`. Returns how many."""
+    order = models.Order
+    line = models.OrderItem
+    order_ids = conn.execute(
+        select(order.id)
+        .where(order.status.in_(FINISHED), order.created_at < cutoff)
+        .order_by(order.created_at)
+        .limit(chunk_size)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+    if not order_ids:
+        return 0
+
+    conn.execute(
+        insert(models.OrderArchive).from_select(
+            ["id", "user_id", "status", "created_at"],
+            select(order.id, order.user_id, order.status, order.created_at).where(order.id.in_(order_ids))
+        )
+    )
+    conn.execute(
+        insert(models.OrderItemArchive).from_select(
+            ["id", "order_id", "menu_item_id", "quantity", "unit_price", "menu_item_name"],
+            select(
+                line.id, line.order_id, line.menu_item_id, line.quantity, line.unit_price, line.menu_item_name
+            ).where(line.order_id.in_(order_ids))
+        )
+    )
+    conn.execute(delete(line).where(line.order_id.in_(order_ids)))
+    conn.execute(delete(order).where(order.id.in_(order_ids)))
+    return len(order_ids)
+
+
+def archive(days: int = ARCHIVE_AFTER_DAYS, chunk_size: int = CHUNK_SIZE) -> int:
+    """Archives every finished order older than `days` days. Returns how many."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    total = 0
+    while True:
+        with engine.begin() as conn:
+            archived = archive_chunk(conn, cutoff, chunk_size)
+        total += archived
+        if archived < chunk_size:
+            return total
+
+
+def run(args) -> int:
+    started = time.perf_counter()
+    archived = archive(args.days, args.chunk_size)
+    print(f"{archived} order(s) archived in {time.perf_counter() - started:.3f}s")
+    return 0
+
+
+def add_arguments(parser):
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS,
+                        help=f"archive the finished orders older than this (default {ARCHIVE_AFTER_DAYS})")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help=f"orders per transaction (default {CHUNK_SIZE})")
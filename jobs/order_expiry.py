@@ -0,0 +1,140 @@
+"""
+Cancels the customer orders left PENDING for longer than ORDER_TTL_SECONDS.
+
+Runs in every API worker (started by the FastAPI lifespan), or once with
+`python manage.py expire-orders`. Each batch is one transaction:
+
+    UPDATE orders SET status = 'CANCELLED'
+    WHERE id IN (SELECT id FROM orders WHERE status = 'PENDING' AND created_at < :cutoff
+                 ORDER BY created_at LIMIT :n FOR UPDATE SKIP LOCKED)
+    RETURNING id, user_id
+
+SKIP LOCKED passes over the orders a complete_order/cancel_order call is
+holding: the player wins, and the workers expiring in parallel never take the
+same order. The order_cancelled logs go through the game journal, so they are
+written with one bulk insert at commit, with the players' progress. A batch
+locks its players' users rows first, then their progress rows, in ascending
+user id, like every other writer: two workers (or a live restock/completion)
+touching the same player wait for each other instead of deadlocking.
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+import models
+from database import SessionLocal
+from game_utils import log_action
+
+logger = logging.getLogger(__name__)
+
+# Age after which a pending order is cancelled (0 disables the expiry)
+ORDER_TTL_SECONDS = float(os.getenv("ORDER_TTL_SECONDS", "3600"))
+# Seconds between two passes of the background job
+ORDER_EXPIRY_INTERVAL = float(os.getenv("ORDER_EXPIRY_INTERVAL", "60"))
+# Orders cancelled per transaction
+ORDER_EXPIRY_BATCH = int(os.getenv("ORDER_EXPIRY_BATCH", "500"))
+
+
+def expire_batch(db: Session, cutoff: datetime, batch_size: int) -> int:
+    """Cancels up to `batch_size` orders created before `cutoff` and commits. Returns how many."""
+    stale = (
+        select(models.Order.id)
+        .where(models.Order.status == models.OrderStatus.PENDING, models.Order.created_at < cutoff)
+        .order_by(models.Order.created_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    expired = db.execute(
+        update(models.Order)
+        .where(models.Order.id.in_(stale))
+        .values(status=models.OrderStatus.CANCELLED)
+        .returning(models.Order.id, models.Order.user_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    for order_id, user_id in sorted(expired, key=lambda row: (row.user_id, row.id)):
+        log_action(
+            db=db,
+            user_id=user_id,
+            action_type="order_cancelled",
+            message=f"Commande expirée : {order_id}"
+        )
+    db.commit()
+    return len(expired)
+
+
+def expire_orders(ttl: float = ORDER_TTL_SECONDS, batch_size: int = ORDER_EXPIRY_BATCH) -> int:
+    """Cancels every order pending for more than `ttl` seconds, batch by batch. Returns how many."""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=ttl)
+    total = 0
+    with SessionLocal() as db:
+        while True:
+            expired = expire_batch(db, cutoff, batch_size)
+            total += expired
+            if expired < batch_size:
+                return total
+
+
+# ----------------------
+# OrderExpiry : background job (FastAPI lifespan)
+# ----------------------
+class OrderExpiry:
+    def __init__(self, ttl: float = ORDER_TTL_SECONDS, interval: float = ORDER_EXPIRY_INTERVAL,
+                 batch_size: int = ORDER_EXPIRY_BATCH):
+        self.ttl = ttl
+        self.interval = interval
+        self.batch_size = batch_size
+        self.expired = 0
+        self.last_run_at = None
+        self._task = None
+
+    async def start(self):
+        if self.ttl > 0 and self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.expired += await asyncio.to_thread(expire_orders, self.ttl, self.batch_size)
+                self.last_run_at = time.time()
+            except Exception:
+                logger.exception("Order expiry failed")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "ttl_seconds": self.ttl,
+            "expired": self.expired,
+            "last_run_at": self.last_run_at
+        }
+
+
+expirer = OrderExpiry()
+
+
+def run(args) -> int:
+    started = time.perf_counter()
+    expired = expire_orders(args.ttl, args.batch_size)
+    print(f"{expired} pending order(s) cancelled in {time.perf_counter() - started:.3f}s")
+    return 0
+
+
+def add_arguments(parser):
+    parser.add_argument("--ttl", type=float, default=ORDER_TTL_SECONDS,
+                        help=f"age in seconds after which a pending order is cancelled (default {ORDER_TTL_SECONDS:g})")
+    parser.add_argument("--batch-size", type=int, default=ORDER_EXPIRY_BATCH,
+                        help=f"orders cancelled per transaction (default {ORDER_EXPIRY_BATCH})")
@@ -0,0 +1,192 @@
+"""
+Maintenance of the monthly gamelog partitions (PostgreSQL).
+
+- creates the partitions of the coming months, moving out of the DEFAULT
+  partition the rows that already landed there;
+- detaches the partitions older than the retention, archives each one to
+  <archive_dir>/<partition>.ndjson.gz, then drops it.
+
+The detach adds the partition's progress totals to progress_carryover in the
+same transaction, so rebuild-progress still counts the dropped logs.
+
+Every step commits on its own: a run interrupted between the detach and the
+drop is finished by the next run (detached partitions are archived first).
+"""
+import gzip
+import json
+import os
+import re
+from datetime import date, datetime, timezone
+
+from sqlalchemy import text
+
+from database import engine
+
+PARTITION_NAME = re.compile(r"^gamelog_y(\d{4})m(\d{2})$")
+
+MONTHS_AHEAD = int(os.getenv("GAMELOG_PARTITIONS_AHEAD", "3"))
+RETENTION_MONTHS = int(os.getenv("GAMELOG_RETENTION_MONTHS", "12"))
+ARCHIVE_DIR = os.getenv("GAMELOG_ARCHIVE_DIR", "archive/gamelog")
+
+
+def add_months(month: date, months: int) -> date:
+    """First day of the month `months` after (or before) `month`."""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"gamelog_y{month.year}m{month.month:02d}"
+
+
+def partition_month(name: str) -> date | None:
+    match = PARTITION_NAME.match(name)
+    return date(int(match[1]), int(match[2]), 1) if match else None
+
+
+def list_partitions(conn) -> dict[str, bool]:
+    """Monthly partition tables -> whether they are still attached to gamelog."""
+    rows = conn.execute(text("""
+        SELECT c.relname, i.inhparent IS NOT NULL AS attached
+        FROM pg_class c
+        LEFT JOIN pg_inherits i
+            ON i.inhrelid = c.oid AND i.inhparent = 'gamelog'::regclass
+        WHERE c.relkind = 'r'
+          AND c.relnamespace = current_schema()::regnamespace
+          AND c.relname ~ '^gamelog_y[0-9]{4}m[0-9]{2}$'
+    """)).all()
+    return {row.relname: row.attached for row in rows}
+
+
+def create_partition(conn, month: date):
+    """Creates the partition of a month, with the rows the DEFAULT partition holds for it."""
+    bounds = {
+        "start": datetime(month.year, month.month, 1, tzinfo=timezone.utc),
+        "end": datetime.combine(add_months(month, 1), datetime.min.time(), tzinfo=timezone.utc),
+    }
+    in_month = "timestamp >= :start AND timestamp < :end"
+
+    moved = conn.execute(text(f"SELECT COUNT(*) FROM gamelog_default WHERE {in_month}"), bounds).scalar()
+    if moved:
+        conn.execute(text("CREATE TEMP TABLE gamelog_moving (LIKE gamelog) ON COMMIT DROP"))
+        conn.execute(text(f"""
+            WITH moved AS (DELETE FROM gamelog_default WHERE {in_month} RETURNING *)
+            INSERT INTO gamelog_moving SELECT * FROM moved
+        """), bounds)
+
+    # Bounds are literals in the DDL
+    start, end = (bounds["start"].isoformat(), bounds["end"].isoformat())
+    conn.execute(text(
+        f"CREATE TABLE {partition_name(month)} PARTITION OF gamelog "
+        f"FOR VALUES FROM ('{start}') TO ('{end}')"
+    ))
+
+    if moved:
+        conn.execute(text("INSERT INTO gamelog SELECT * FROM gamelog_moving"))
+    return moved
+
+
+def carry_over(conn, name: str) -> int:
+    """
+    Adds the progress totals of a partition's logs to progress_carryover (same
+    rules as rebuild-progress). Returns the number of players.
+    """
+    return conn.execute(text(f"""
+        INSERT INTO progress_carryover AS carried (user_id, money_earned, money_spent, orders, actions)
+        SELECT user_id,
+               COALESCE(SUM(amount) FILTER (WHERE action_type = 'order_completed' AND amount <> 0), 0),
+               COALESCE(SUM(ABS(amount)) FILTER (WHERE action_type = 'restock' AND amount <> 0), 0),
+               COUNT(*) FILTER (WHERE action_type = 'order_completed' AND amount <> 0),
+               COUNT(*)
+        FROM {name}
+        WHERE user_id IS NOT NULL
+        GROUP BY user_id
+        ON CONFLICT (user_id) DO UPDATE SET
+            money_earned = carried.money_earned + EXCLUDED.money_earned,
+            money_spent = carried.money_spent + EXCLUDED.money_spent,
+            orders = carried.orders + EXCLUDED.orders,
+            actions = carried.actions + EXCLUDED.actions
+    """)).rowcount
+
+
+def archive_partition(conn, name: str, archive_dir: str) -> int:
+    """Writes a detached partition to <archive_dir>/<name>.ndjson.gz. Returns the row count."""
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{name}.ndjson.gz")
+    partial_path = path + ".partial"
+
+    rows = conn.execute(
+        text(f"SELECT id, user_id, action_type, message, amount, timestamp FROM {name} ORDER BY timestamp, id"),
+        execution_options={"yield_per": 1000}
+    ).mappings()
+
+    count = 0
+    with gzip.open(partial_path, "wt", encoding="utf-8") as archive:
+        for row in rows:
+            archive.write(json.dumps({
+                "id": row["id"],
+                "user_id": row["user_id"],
+                "action_type": row["action_type"],
+                "message": row["message"],
+                "amount": None if row["amount"] is None else str(row["amount"]),
+                "timestamp": row["timestamp"].isoformat(),
+            }, ensure_ascii=False) + "\n")
+            count += 1
+
+    # The archive only takes its final name once complete
+    os.replace(partial_path, path)
+    return count
+
+
+def run(args) -> int:
+    if engine.dialect.name != "postgresql":
+        print("gamelog is only partitioned on PostgreSQL, nothing to do")
+        return 0
+
+    this_month = date.today().replace(day=1)
+    cutoff = add_months(this_month, -args.retention_months)
+
+    with engine.connect() as conn:
+        partitions = list_partitions(conn)
+        conn.commit()
+
+        # 1. Partitions of the coming months
+        for offset in range(args.months_ahead + 1):
+            month = add_months(this_month, offset)
+            if partition_name(month) in partitions:
+                continue
+            if args.dry_run:
+                print(f"would create {partition_name(month)}")
+                continue
+            moved = create_partition(conn, month)
+            conn.commit()
+            print(f"created {partition_name(month)} ({moved} row(s) moved from gamelog_default)")
+
+        # 2. Partitions past the retention: detach, archive, drop
+        for name, attached in sorted(partitions.items()):
+            if partition_month(name) >= cutoff:
+                continue
+            if args.dry_run:
+                print(f"would archive {name} to {args.archive_dir}")
+                continue
+            if attached:
+                carried = carry_over(conn, name)
+                conn.execute(text(f"ALTER TABLE gamelog DETACH PARTITION {name}"))
+                conn.commit()
+                print(f"detached {name}: totals of {carried} player(s) carried over")
+            count = archive_partition(conn, name, args.archive_dir)
+            conn.execute(text(f"DROP TABLE {name}"))
+            conn.commit()
+            print(f"archived {name}: {count} row(s)")
+
+    return 0
+
+
+def add_arguments(parser):
+    parser.add_argument("--months-ahead", type=int, default=MONTHS_AHEAD,
+                        help=f"partitions to create in advance (default {MONTHS_AHEAD})")
+    parser.add_argument("--retention-months", type=int, default=RETENTION_MONTHS,
+                        help=f"months of logs kept in the database (default {RETENTION_MONTHS})")
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR,
+                        help=f"where the archived partitions are written (default {ARCHIVE_DIR})")
+    parser.add_argument("--dry-run", action="store_true", help="print the actions without running them")
@@ -0,0 +1,294 @@
+"""
+Recomputes PlayerProgress from the GameLog history.
+
+The players are split in ranges of user ids, processed in parallel by a
+process pool. For each range, the database aggregates the logs (GROUP BY
+user_id), so memory stays bounded by the number of players of a range,
+whatever the number of log rows:
+
+- earned / orders: order_completed logs carrying an amount (the order totals)
+- spent: restock logs
+- actions: every log
+- level: compute_level() of the new totals
+
+The logs of the months dropped by the partition retention are no longer in
+gamelog: `manage.py partitions` adds their totals to progress_carryover before
+dropping them, and the rebuild starts from there.
+
+The progress rows of the range are locked first: a concurrent commit of the
+game journal waits for the rebuild of its player instead of being overwritten.
+The changed rows are written back with one UPDATE ... FROM (VALUES ...) per
+range on PostgreSQL (an executemany UPDATE on SQLite).
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from decimal import Decimal
+
+from sqlalchemy import (
+    Integer, Numeric, bindparam, case, column, create_engine, func, insert, literal, select, union_all, update, values
+)
+from sqlalchemy.engine import Engine
+
+import models
+from database import engine
+from game_utils import bump_state_version, compute_level
+
+CHUNK_SIZE = int(os.getenv("REBUILD_CHUNK_SIZE", "1000"))
+WORKERS = int(os.getenv("REBUILD_WORKERS", "4"))
+
+CENTS = Decimal("0.01")
+
+
+@dataclass(frozen=True)
+class Progress:
+    money_earned: Decimal = Decimal("0.00")
+    money_spent: Decimal = Decimal("0.00")
+    orders: int = 0
+    level: int = 1
+    actions: int = 0
+
+
+def user_id_ranges(chunk_size: int, bind: Engine | None = None) -> list[tuple[int, int]]:
+    """[start, end) ranges of user ids covering every player with logs or progress."""
+    with (bind or engine).connect() as conn:
+        low, high = conn.execute(
+            select(func.min(models.User.id), func.max(models.User.id))
+        ).one()
+    if low is None:
+        return []
+    return [(start, min(start + chunk_size, high + 1)) for start in range(low, high + 1, chunk_size)]
+
+
+def aggregate_logs(conn, start: int, end: int) -> tuple[dict[int, Progress], int]:
+    """Progress computed from the carry-over and the logs of the range, and the number of logs read."""
+    log = models.GameLog
+    carryover = models.ProgressCarryover
+    order_total = (log.action_type == "order_completed") & (log.amount != 0)
+    restock = (log.action_type == "restock") & (log.amount != 0)
+
+    # One statement, so the partitions job can't move logs to the carry-over between two reads
+    totals = union_all(
+        select(
+            log.user_id,
+            func.sum(case((order_total, log.amount), else_=0)).label("earned"),
+            func.sum(case((restock, func.abs(log.amount)), else_=0)).label("spent"),
+            func.sum(case((order_total, 1), else_=0)).label("orders"),
+            func.count().label("actions"),
+            func.count().label("logs")
+        )
+        .where(log.user_id >= start, log.user_id < end)
+        .group_by(log.user_id),
+        select(
+            carryover.user_id,
+            carryover.money_earned,
+            carryover.money_spent,
+            carryover.orders,
+            carryover.actions,
+            literal(0)
+        )
+        .where(carryover.user_id >= start, carryover.user_id < end)
+    ).subquery()
+
+    rows = conn.execute(
+        select(
+            totals.c.user_id,
+            func.sum(totals.c.earned).label("earned"),
+            func.sum(totals.c.spent).label("spent"),
+            func.sum(totals.c.orders).label("orders"),
+            func.sum(totals.c.actions).label("actions"),
+            func.sum(totals.c.logs).label("logs")
+        ).group_by(totals.c.user_id)
+    ).all()
+
+    computed = {}
+    for row in rows:
+        earned = Decimal(row.earned or 0).quantize(CENTS)
+        orders = int(row.orders or 0)
+        computed[row.user_id] = Progress(
+            money_earned=earned,
+            money_spent=Decimal(row.spent or 0).quantize(CENTS),
+            orders=orders,
+            level=compute_level(earned, orders),
+            actions=int(row.actions)
+        )
+    return computed, sum(int(row.logs) for row in rows)
+
+
+def current_progress(conn, start: int, end: int) -> dict[int, Progress]:
+    """The stored progress rows of the range, locked until the end of the transaction."""
+    progress = models.PlayerProgress.__table__
+    rows = conn.execute(
+        select(progress)
+        .where(progress.c.user_id >= start, progress.c.user_id < end)
+        .with_for_update()
+    ).all()
+    return {
+        row.user_id: Progress(
+            money_earned=Decimal(row.total_money_earned or 0).quantize(CENTS),
+            money_spent=Decimal(row.total_money_spent or 0).quantize(CENTS),
+            orders=row.total_orders or 0,
+            level=row.current_level or 1,
+            actions=row.total_actions or 0
+        )
+        for row in rows
+    }
+
+
+def write_progress(conn, changed: dict[int, Progress]):
+    progress = models.PlayerProgress.__table__
+    rows = [
+        {"player_id": user_id,
+         "earned": new.money_earned,
+         "spent": new.money_spent,
+         "orders": new.orders,
+         "level": new.level,
+         "actions": new.actions}
+        for user_id, new in changed.items()
+    ]
+
+    if conn.dialect.name == "postgresql":
+        new = values(
+            column("player_id", Integer),
+            column("earned", Numeric(12, 2)),
+            column("spent", Numeric(12, 2)),
+            column("orders", Integer),
+            column("level", Integer),
+            column("actions", Integer),
+            name="new"
+        ).data([tuple(row.values()) for row in rows])
+        conn.execute(
+            update(progress)
+            .where(progress.c.user_id == new.c.player_id)
+            .values(
+                total_money_earned=new.c.earned,
+                total_money_spent=new.c.spent,
+                total_orders=new.c.orders,
+                current_level=new.c.level,
+                total_actions=new.c.actions
+            )
+        )
+    else:
+        conn.execute(
+            update(progress)
+            .where(progress.c.user_id == bindparam("player_id"))
+            .values(
+                total_money_earned=bindparam("earned"),
+                total_money_spent=bindparam("spent"),
+                total_orders=bindparam("orders"),
+                current_level=bindparam("level"),
+                total_actions=bindparam("actions")
+            ),
+            rows
+        )
+
+    # New ETags for the players' stats
+    bump_state_version(conn, list(changed))
+
+
+def rebuild_range(start: int, end: int, dry_run: bool, show: int, bind: Engine | None = None) -> dict:
+    """Rebuilds the players of [start, end) in one transaction. Runs in a pool worker."""
+    with (bind or worker_engine or engine).connect() as conn:
+        stored = current_progress(conn, start, end)
+        computed, log_count = aggregate_logs(conn, start, end)
+
+        # Players with neither logs nor carry-over go back to zero
+        changed = {}
+        for user_id in stored.keys() | computed.keys():
+            new = computed.get(user_id, Progress())
+            if stored.get(user_id) != new:
+                changed[user_id] = new
+
+        missing = [user_id for user_id in changed if user_id not in stored]
+        if not dry_run and changed:
+            if missing:
+                conn.execute(insert(models.PlayerProgress.__table__), [
+                    {"user_id": user_id} for user_id in missing
+                ])
+            write_progress(conn, changed)
+
+        if dry_run:
+            conn.rollback()
+        else:
+            conn.commit()
+
+    return {
+        "users": len(stored.keys() | computed.keys()),
+        "logs": log_count,
+        "changed": len(changed),
+        "created": len(missing),
+        "diffs": [
+            (user_id, stored.get(user_id), new)
+            for user_id, new in sorted(changed.items())[:show]
+        ]
+    }
+
+
+# Engine of a pool worker, created from the URL of the parent's engine
+worker_engine: Engine | None = None
+
+
+def init_worker(url: str):
+    # Connections inherited from the parent process can't be shared: each worker opens its own
+    global worker_engine
+    worker_engine = create_engine(url)
+
+
+def rebuild(chunk_size: int = CHUNK_SIZE, workers: int = WORKERS, dry_run: bool = False, show: int = 20,
+            bind: Engine | None = None) -> dict:
+    """
+    Rebuilds every player's progress on `bind` (the application's engine by default);
+    prints the progress of the job and returns the totals.
+    """
+    bind = bind or engine
+    ranges = user_id_ranges(chunk_size, bind)
+    totals = {"users": 0, "logs": 0, "changed": 0, "created": 0}
+    diffs = []
+    started = time.perf_counter()
+
+    def report(result):
+        for key in totals:
+            totals[key] += result[key]
+        diffs.extend(result["diffs"])
+        elapsed = time.perf_counter() - started
+        print(
+            f"{totals['users']} players, {totals['logs']} logs, {totals['changed']} changed "
+            f"- {totals['logs'] / elapsed:,.0f} logs/s"
+        )
+
+    if workers <= 1:
+        for start, end in ranges:
+            report(rebuild_range(start, end, dry_run, show, bind))
+    else:
+        url = bind.url.render_as_string(hide_password=False)
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(url,)) as pool:
+            futures = [pool.submit(rebuild_range, start, end, dry_run, show) for start, end in ranges]
+            for future in as_completed(futures):
+                report(future.result())
+
+    totals["seconds"] = round(time.perf_counter() - started, 3)
+    totals["diffs"] = sorted(diffs)[:show]
+    return totals
+
+
+def run(args) -> int:
+    totals = rebuild(args.chunk_size, args.workers, args.dry_run, args.show)
+
+    for user_id, old, new in totals["diffs"]:
+        print(f"user {user_id}: {old} -> {new}")
+    verb = "would change" if args.dry_run else "changed"
+    print(
+        f"{totals['users']} players, {totals['logs']} logs in {totals['seconds']}s: "
+        f"{verb} {totals['changed']} progress row(s) ({totals['created']} missing)"
+    )
+    return 0
+
+
+def add_arguments(parser):
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help=f"user ids per transaction (default {CHUNK_SIZE})")
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help=f"worker processes, 1 runs in this process (default {WORKERS})")
+    parser.add_argument("--dry-run", action="store_true", help="print the differences without writing them")
+    parser.add_argument("--show", type=int, default=20, help="differences printed (default 20)")
@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+
+from sortedcontainers import SortedList
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import models
+from database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two full reloads from player_progress (0 disables them)
+RECONCILE_INTERVAL = float(os.getenv("LEADERBOARD_RECONCILE_INTERVAL", "300"))
+
+
+@dataclass(frozen=True)
+class LeaderboardEntry:
+    user_id: int
+    username: str
+    total_money_earned: Decimal
+    level: int
+
+
+def sort_key(entry: LeaderboardEntry):
+    # Most money earned first, then highest level, then oldest account
+    return (-entry.total_money_earned, -entry.level, entry.user_id)
+
+
+# ----------------------
+# Leaderboard : in-process ranking of the players
+# ----------------------
+class Leaderboard:
+    """
+    Players sorted by money earned, in a SortedList: ranks and updates are
+    O(log n) and the reads never touch the database.
+    Loaded from player_progress (at startup, or on first read), updated after
+    each commit by the game journal and reloaded periodically to catch the
+    writes made outside this process (other workers, maintenance commands).
+    """
+
+    def __init__(self):
+        self._entries = SortedList(key=sort_key)
+        self._by_user: dict[int, LeaderboardEntry] = {}
+        self._lock = threading.Lock()
+        self._reloading = None  # updates received while a reload reads the DB
+        self._task = None
+        self.warmed = False
+        self.reloaded_at = None
+
+    # ---------- reads ----------
+    def top(self, limit: int) -> list[LeaderboardEntry]:
+        with self._lock:
+            return list(self._entries.islice(0, limit))
+
+    def rank(self, user_id: int) -> tuple[int, LeaderboardEntry] | None:
+        """(1-based rank, entry) of a player, None if they have no progress yet."""
+        with self._lock:
+            entry = self._by_user.get(user_id)
+            if entry is None:
+                return None
+            return self._entries.index(entry) + 1, entry
+
+    def __len__(self):
+        return len(self._by_user)
+
+    def knows(self, user_id: int) -> bool:
+        return user_id in self._by_user
+
+    def username(self, user_id: int) -> str | None:
+        entry = self._by_user.get(user_id)
+        return entry.username if entry else None
+
+    # ---------- writes ----------
+    def _put(self, entry: LeaderboardEntry):
+        previous = self._by_user.get(entry.user_id)
+        if previous is not None:
+            self._entries.remove(previous)
+        self._entries.add(entry)
+        self._by_user[entry.user_id] = entry
+
+    def update(self, user_id: int, total_money_earned: Decimal, level: int, username: str | None = None):
+        """New totals of a player, once committed. Ignored until the leaderboard is loaded."""
+        with self._lock:
+            if self._reloading is not None:
+                self._reloading.append((user_id, total_money_earned, level, username))
+            if not self.warmed:
+                return
+            username = username or self.username(user_id)
+            if username is None:
+                return
+            self._put(LeaderboardEntry(user_id, username, Decimal(total_money_earned or 0), level or 1))
+
+    def rename(self, user_id: int, username: str):
+        with self._lock:
+            entry = self._by_user.get(user_id)
+            if entry is not None:
+                self._put(LeaderboardEntry(user_id, username, entry.total_money_earned, entry.level))
+
+    def remove(self, user_id: int):
+        with self._lock:
+            entry = self._by_user.pop(user_id, None)
+            if entry is not None:
+                self._entries.remove(entry)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+            self.warmed = False
+            self.reloaded_at = None
+
+    def load(self, db: Session):
+        """Replaces the ranking with the content of player_progress."""
+        with self._lock:
+            self._reloading = []
+
+        try:
+            rows = db.execute(
+                select(
+                    models.PlayerProgress.user_id,
+                    models.User.username,
+                    models.PlayerProgress.total_money_earned,
+                    models.PlayerProgress.current_level
+                ).join(models.User, models.User.id == models.PlayerProgress.user_id)
+            ).all()
+            entries = SortedList(
+                (LeaderboardEntry(row.user_id, row.username, Decimal(row.total_money_earned or 0), row.current_level or 1)
+                 for row in rows),
+                key=sort_key
+            )
+        except Exception:
+            with self._lock:
+                self._reloading = None
+            raise
+
+        with self._lock:
+            pending, self._reloading = self._reloading, None
+            self._entries = entries
+            self._by_user = {entry.user_id: entry for entry in entries}
+            self.warmed = True
+            self.reloaded_at = time.time()
+            # Commits that happened during the read
+            for user_id, total_money_earned, level, username in pending:
+                username = username or self.username(user_id)
+                if username is not None:
+                    self._put(LeaderboardEntry(user_id, username, Decimal(total_money_earned or 0), level or 1))
+
+    def reload(self):
+        with SessionLocal() as db:
+            self.load(db)
+
+    # ---------- background reconciliation (FastAPI lifespan) ----------
+    async def start(self):
+        try:
+            await asyncio.to_thread(self.reload)
+        except Exception:
+            # Not fatal: the first read loads it
+            logger.exception("Leaderboard warm-up failed")
+        if RECONCILE_INTERVAL > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(RECONCILE_INTERVAL)
+            try:
+                await asyncio.to_thread(self.reload)
+            except Exception:
+                logger.exception("Leaderboard reconciliation failed")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "players": len(self),
+            "warmed": self.warmed,
+            "reloaded_at": self.reloaded_at
+        }
+
+
+leaderboard = Leaderboard()
@@ -0,0 +1,70 @@
+import json
+import os
+from bisect import bisect_right
+from dataclasses import dataclass
+from decimal import Decimal
+
+from sqlalchemy import case
+
+# Level thresholds: a level is reached once both the money earned and the orders reach its minimums
+LEVELS_FILE = os.getenv("LEVELS_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "levels.json"))
+
+
+@dataclass(frozen=True)
+class LevelThreshold:
+    level: int
+    money_earned: Decimal
+    orders: int
+
+
+class LevelCurve:
+    """
+    Level thresholds sorted by level, evaluated by bisection.
+    Both minimums grow with the level, so the reached level is the lowest of
+    the level reached by the money earned and the one reached by the orders.
+    """
+
+    def __init__(self, thresholds: list[LevelThreshold]):
+        thresholds = sorted(thresholds, key=lambda threshold: threshold.level)
+        if not thresholds or thresholds[0].money_earned != 0 or thresholds[0].orders != 0:
+            raise ValueError("The first level must start at 0 money earned and 0 orders")
+        for lower, upper in zip(thresholds, thresholds[1:]):
+            if upper.level == lower.level or upper.money_earned < lower.money_earned or upper.orders < lower.orders:
+                raise ValueError(f"Level {upper.level} must have higher thresholds than level {lower.level}")
+
+        self.thresholds = thresholds
+        self._money_earned = [threshold.money_earned for threshold in thresholds]
+        self._orders = [threshold.orders for threshold in thresholds]
+
+    def level_for(self, money_earned: Decimal, orders: int) -> int:
+        index = min(
+            bisect_right(self._money_earned, money_earned or 0),
+            bisect_right(self._orders, orders or 0)
+        )
+        return self.thresholds[index - 1].level
+
+    def level_expression(self, money_earned, orders):
+        """The same evaluation as a SQL CASE on two columns, highest level first."""
+        return case(
+            *[
+                ((money_earned >= threshold.money_earned) & (orders >= threshold.orders), threshold.level)
+                for threshold in reversed(self.thresholds[1:])
+            ],
+            else_=self.thresholds[0].level
+        )
+
+
+def load_level_curve(path: str = LEVELS_FILE) -> LevelCurve:
+    with open(path, encoding="utf-8") as levels_file:
+        return LevelCurve([
+            LevelThreshold(
+                level=int(entry["level"]),
+                money_earned=Decimal(str(entry["money_earned"])),
+                orders=int(entry["orders"])
+            )
+            for entry in json.load(levels_file)
+        ])
+
+
+# Loaded once per process: restart the workers after editing the file
+level_curve = load_level_curve()
@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import _rate_limit_exceeded_handler
@@ -9,7 +11,12 @@ from limiter import limiter
 
 load_dotenv(".env")
 
+from database import ASYNC_DB
 from routes import auth, users, menu, restock, inventory, orders, stats
+import gamelog_writer
+from leaderboard import leaderboard
+from global_stats import global_stats
+from jobs import order_expiry
 
 
 #-------------------------------------
@@ -55,20 +62,38 @@ tags_metadata = [
     }
 ]
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background flush of the write-behind game logs (GAMELOG_WRITE_BEHIND=true)
+    await gamelog_writer.writer.start()
+    # Load the leaderboard and reconcile it periodically (a failed load is retried on first read)
+    await leaderboard.start()
+    # Refresh the admin stats snapshot (ADMIN_STATS_REFRESH_INTERVAL)
+    await global_stats.start()
+    # Cancel the orders left pending past ORDER_TTL_SECONDS
+    await order_expiry.expirer.start()
+    yield
+    await order_expiry.expirer.stop()
+    await global_stats.stop()
+    await leaderboard.stop()
+    # Drain the queued logs before the worker exits
+    await gamelog_writer.writer.stop()
+
+
 app = FastAPI(
     title = "Café Manager API",
     description="Backend API for a café management game",
     version="1.0.0",
-    openapi_tags=tags_metadata
+    openapi_tags=tags_metadata,
+    lifespan=lifespan
 )
 
 app.include_router(auth.router)
 app.include_router(users.router)
-app.include_router(menu.router)
-app.include_router(restock.router)
-app.include_router(inventory.router)
-app.include_router(orders.router)
-app.include_router(stats.router)
+
+# Gameplay routes: async handlers on the async engine when ASYNC_DB=true
+for module in (menu, restock, inventory, orders, stats):
+    app.include_router(module.async_router if ASYNC_DB else module.router)
 
 
 
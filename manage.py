@@ -0,0 +1,64 @@
+"""
+Maintenance commands, run against the database of DATABASE_URL.
+
+    python manage.py partitions --retention-months 12
+    python manage.py rebuild-progress --dry-run
+    python manage.py backfill-daily-stats --since 2026-01-01
+    python manage.py expire-orders --ttl 3600
+    python manage.py archive-orders --days 90
+"""
+import argparse
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv(".env")
+
+from jobs import daily_stats, order_archive, order_expiry, partitions, rebuild_progress
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Café Manager maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser(
+        "partitions",
+        help="create the coming gamelog partitions, archive and drop the expired ones"
+    )
+    partitions.add_arguments(command)
+    command.set_defaults(run=partitions.run)
+
+    command = commands.add_parser(
+        "rebuild-progress",
+        help="recompute every player's progress from the game logs"
+    )
+    rebuild_progress.add_arguments(command)
+    command.set_defaults(run=rebuild_progress.run)
+
+    command = commands.add_parser(
+        "backfill-daily-stats",
+        help="rebuild the per day player stats from the game logs"
+    )
+    daily_stats.add_arguments(command)
+    command.set_defaults(run=daily_stats.run)
+
+    command = commands.add_parser(
+        "expire-orders",
+        help="cancel the orders pending for longer than the TTL"
+    )
+    order_expiry.add_arguments(command)
+    command.set_defaults(run=order_expiry.run)
+
+    command = commands.add_parser(
+        "archive-orders",
+        help="move the old completed and cancelled orders to the archive tables"
+    )
+    order_archive.add_arguments(command)
+    command.set_defaults(run=order_archive.run)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
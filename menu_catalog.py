@@ -0,0 +1,139 @@
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from types import MappingProxyType
+from typing import Iterable, Mapping
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import models
+
+# Seconds a worker trusts its snapshot: bounds how long a menu change made on another worker goes unseen
+MENU_CATALOG_TTL = float(os.getenv("MENU_CATALOG_TTL", "60"))
+
+
+@dataclass(frozen=True)
+class CatalogItem:
+    id: int
+    name: str
+    purchase_price: Decimal
+    selling_price: Decimal
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    version: int
+    items: Mapping[int, CatalogItem]
+    loaded_at: float
+    # Hash of the content: unlike the version, the same on every worker (menu ETag)
+    fingerprint: str
+
+
+# ----------------------
+# MenuCatalog : in-process copy of menu_items
+# ----------------------
+class MenuCatalog:
+    """
+    Immutable snapshot of the whole menu, shared by every request of the worker.
+    A menu write reloads it after its commit (version + 1). Readers asking for an
+    id the snapshot lacks (item created on another worker) trigger one reload;
+    the ids the reloaded snapshot lacks are then known missing until the next
+    reload, so unknown ids can't make every request read the whole table.
+    """
+
+    def __init__(self, ttl: float = MENU_CATALOG_TTL):
+        self.ttl = ttl
+        self._snapshot: CatalogSnapshot | None = None
+        self._version = 0
+        # Version of the last snapshot read to look for missing ids
+        self._checked_version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.unknown = 0
+
+    def _lookup(self, db: Session) -> tuple[CatalogSnapshot, bool]:
+        """(snapshot, whether it was just reloaded)."""
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - snapshot.loaded_at < self.ttl:
+            with self._lock:
+                self.hits += 1
+            return snapshot, False
+        with self._lock:
+            self.misses += 1
+        return self.reload(db), True
+
+    def snapshot(self, db: Session) -> CatalogSnapshot:
+        return self._lookup(db)[0]
+
+    def get_many(self, db: Session, menu_item_ids: Iterable[int]) -> dict[int, CatalogItem]:
+        """The known items among `menu_item_ids`; missing ids are absent from the result."""
+        menu_item_ids = set(menu_item_ids)
+        snapshot, reloaded = self._lookup(db)
+        if not menu_item_ids <= snapshot.items.keys():
+            if not reloaded and snapshot.version != self._checked_version:
+                snapshot = self.reload(db)
+            with self._lock:
+                self._checked_version = snapshot.version
+                self.unknown += len(menu_item_ids - snapshot.items.keys())
+        return {menu_item_id: snapshot.items[menu_item_id] for menu_item_id in menu_item_ids if menu_item_id in snapshot.items}
+
+    def get(self, db: Session, menu_item_id: int) -> CatalogItem | None:
+        return self.get_many(db, [menu_item_id]).get(menu_item_id)
+
+    def reload(self, db: Session) -> CatalogSnapshot:
+        """Reads menu_items and swaps the snapshot in one assignment."""
+        started = time.monotonic()
+        items = MappingProxyType({
+            row.id: CatalogItem(row.id, row.name, row.purchase_price, row.selling_price)
+            for row in db.execute(
+                select(
+                    models.MenuItem.id,
+                    models.MenuItem.name,
+                    models.MenuItem.purchase_price,
+                    models.MenuItem.selling_price
+                ).order_by(models.MenuItem.id)
+            )
+        })
+        fingerprint = hashlib.sha1(repr(list(items.values())).encode()).hexdigest()[:16]
+        with self._lock:
+            self.reloads += 1
+            # A slower reload that read the table earlier must not replace a newer snapshot
+            if self._snapshot is not None and self._snapshot.loaded_at > started:
+                return self._snapshot
+            self._version += 1
+            self._snapshot = CatalogSnapshot(self._version, items, started, fingerprint)
+            return self._snapshot
+
+    def clear(self):
+        with self._lock:
+            self._snapshot = None
+            self._checked_version = None
+            self.hits = 0
+            self.misses = 0
+            self.reloads = 0
+            self.unknown = 0
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "version": snapshot.version if snapshot else None,
+                "fingerprint": snapshot.fingerprint if snapshot else None,
+                "items": len(snapshot.items) if snapshot else 0,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "unknown_ids": self.unknown,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+menu_catalog = MenuCatalog()
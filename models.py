@@ -1,8 +1,10 @@
 from sqlalchemy import (
     Column, Integer, String, Numeric,
-    ForeignKey, Boolean, DateTime, Enum
+    ForeignKey, Boolean, Date, DateTime, Enum,
+    Index, UniqueConstraint
 )
-from sqlalchemy.sql import func
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.sql import func, text
 from sqlalchemy.orm import relationship
 from database import Base
 from enum import Enum as PyEnum
@@ -18,6 +20,8 @@ class User(Base):
     password_hash = Column(String)
     money = Column(Numeric(10, 2), server_default="0.00", nullable=False)
     is_admin = Column(Boolean, server_default="false", nullable=False)
+    # Bumped by every write to the player's money, inventory or progress (ETags of their reads)
+    state_version = Column(Integer, server_default="0", nullable=False)
 
     # Relations
     orders = relationship("Order", back_populates="user",lazy="raise_on_sql")
@@ -45,10 +49,14 @@ class MenuItem(Base):
 # ------------------------
 class Inventory(Base):
     __tablename__ = "inventory"
+    # One stock row per (player, product); also the index of the restock/complete lookups
+    __table_args__ = (
+        UniqueConstraint("user_id", "menu_item_id", name="uq_inventory_user_menu_item"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     menu_item_id = Column(Integer, ForeignKey("menu_items.id"), nullable=False)
     quantity = Column(Integer, default=0)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
 
     # Relationship
     user = relationship("User", back_populates="inventory_items", lazy="raise_on_sql")
@@ -66,11 +74,31 @@ class OrderStatus(str, PyEnum):
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        # /admin/orders filtered by player and status, newest first
+        Index("ix_orders_user_status_created", "user_id", "status", "created_at"),
+        # /admin/orders keyset pages, unfiltered or by status
+        Index("ix_orders_created_id", "created_at", "id"),
+        Index("ix_orders_status_created_id", "status", "created_at", "id"),
+        # GET /orders: a player's orders, newest first
+        Index("ix_orders_user_created_id", "user_id", "created_at", "id"),
+        # Pending orders only: small, and it stays small
+        Index(
+            "ix_orders_pending_created", "created_at",
+            postgresql_where=text("status = 'PENDING'"),
+            sqlite_where=text("status = 'PENDING'")
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True) # Les numéros de commandes
-    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
     status = Column(Enum(OrderStatus), default=OrderStatus.PENDING,  nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # SQLite stores CURRENT_TIMESTAMP without microseconds: bind the keyset cursors the same way
+    created_at = Column(
+        DateTime(timezone=True).with_variant(sqlite.DATETIME(truncate_microseconds=True), "sqlite"),
+        server_default=func.now(),
+        nullable=False
+    )
 
     # Relationship
     user = relationship("User", back_populates="orders", lazy="raise_on_sql")
@@ -82,26 +110,70 @@ class OrderItem(Base):
     order_id = Column(Integer, ForeignKey("orders.id"), index=True)
     menu_item_id = Column(Integer, ForeignKey("menu_items.id"))
     quantity = Column(Integer)
+    # Captured when the order is placed: a later menu change leaves the order as it was
+    unit_price = Column(Numeric(10, 2), nullable=False)
+    menu_item_name = Column(String, nullable=False)
 
     # Relations
     order = relationship("Order", back_populates="items", lazy="raise_on_sql")
     menu_item = relationship("MenuItem", back_populates="orders_items", lazy="raise_on_sql")
 
+
+# ----------------
+# ORDERS ARCHIVE : finished orders moved out of the hot tables (manage.py archive-orders)
+# Same ids as in orders / order_items, read back by read_order
+# ------------------------
+class OrderArchive(Base):
+    __tablename__ = "orders_archive"
+    __table_args__ = (
+        Index("ix_orders_archive_user_created", "user_id", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    status = Column(Enum(OrderStatus), nullable=False)
+    # Same SQLite storage as orders.created_at, so the listing cursors compare the same way
+    created_at = Column(
+        DateTime(timezone=True).with_variant(sqlite.DATETIME(truncate_microseconds=True), "sqlite"),
+        nullable=False
+    )
+    archived_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class OrderItemArchive(Base):
+    __tablename__ = "order_items_archive"
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    order_id = Column(Integer, ForeignKey("orders_archive.id"), index=True)
+    menu_item_id = Column(Integer, ForeignKey("menu_items.id"))
+    quantity = Column(Integer)
+    unit_price = Column(Numeric(10, 2), nullable=False)
+    menu_item_name = Column(String, nullable=False)
+
 # ----------------
 # GameLog : For the player's history
 # ------------------------
 class GameLog(Base):
+    # Range-partitioned by month on timestamp on PostgreSQL (primary key (id, timestamp)),
+    # see migration b7d2e5f8a1c3 and `python manage.py partitions`
     __tablename__ = "gamelog"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
     action_type = Column(String)
     message = Column(String)
     amount = Column(Numeric(10, 2), nullable=True)
-    timestamp = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # SQLite stores text: same format as its CURRENT_TIMESTAMP, so keyset comparisons hold
+    timestamp = Column(
+        DateTime(timezone=True).with_variant(sqlite.DATETIME(truncate_microseconds=True), "sqlite"),
+        server_default=func.now(),
+        nullable=False
+    )
 
     # Relationship
     user = relationship("User", back_populates="game_logs", lazy="raise_on_sql")
 
+# /game/history: a player's logs, newest first
+Index("ix_gamelog_user_id_timestamp", GameLog.user_id, GameLog.timestamp.desc(), GameLog.id.desc())
+
 
 # ----------------
 # PlayerProgress : For players' cumulative statistics
@@ -115,6 +187,35 @@ class PlayerProgress(Base):
     total_orders = Column(Integer, default=0)
     current_level = Column(Integer, default=1)
     total_money_spent = Column(Numeric(12, 2), server_default="0.00")
+    # Number of GameLog rows of the player, kept by the game journal
+    total_actions = Column(Integer, nullable=False, server_default="0")
 
     # Relationship
-    user = relationship("User", back_populates="player_progress", lazy="raise_on_sql")
\ No newline at end of file
+    user = relationship("User", back_populates="player_progress", lazy="raise_on_sql")
+
+
+# ----------------
+# PlayerDailyStats : per day economics of a player (rollup of the game logs)
+# ----------------------
+class PlayerDailyStats(Base):
+    __tablename__ = "player_daily_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)  # UTC day
+    money_earned = Column(Numeric(12, 2), nullable=False, server_default="0.00")
+    money_spent = Column(Numeric(12, 2), nullable=False, server_default="0.00")
+    orders_completed = Column(Integer, nullable=False, server_default="0")
+    orders_cancelled = Column(Integer, nullable=False, server_default="0")
+
+
+# ----------------
+# ProgressCarryover : progress totals of the game logs dropped by the retention
+# ----------------------
+class ProgressCarryover(Base):
+    __tablename__ = "progress_carryover"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    money_earned = Column(Numeric(12, 2), nullable=False, server_default="0.00")
+    money_spent = Column(Numeric(12, 2), nullable=False, server_default="0.00")
+    orders = Column(Integer, nullable=False, server_default="0")
+    actions = Column(Integer, nullable=False, server_default="0")
@@ -0,0 +1,63 @@
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import Select, func, select, text
+from sqlalchemy.orm import Session
+
+
+# ----------------------
+# KEYSET CURSORS
+# An opaque token holding the sort key of the last row of a page:
+# the next page starts strictly after it.
+# ----------------------
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    payload = json.dumps([timestamp.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """(timestamp, id) of a cursor. Invalid cursor -> 400."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+# ----------------------
+# ROW COUNT ESTIMATES
+# Counting a large filtered set scans all of it: the listings report the
+# planner's estimate instead, unless the exact count is asked for.
+# ----------------------
+def estimate_count(db: Session, query: Select, table_name: str, filtered: bool) -> int | None:
+    """
+    Estimated rows of `query` on Postgres: pg_class.reltuples for a whole
+    table, the planner's row estimate for a filtered one. None elsewhere, or
+    when the table was never analyzed.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    if not filtered:
+        rows = db.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)"),
+            {"table": table_name}
+        ).scalar()
+        return rows if rows is not None and rows >= 0 else None
+
+    sql = str(query.compile(dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True}))
+    plan = db.execute(text("EXPLAIN (FORMAT JSON) " + sql)).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def count_rows(db: Session, query: Select, table_name: str, filtered: bool, exact: bool) -> tuple[int, bool]:
+    """(row count, whether it is exact)."""
+    if not exact:
+        estimate = estimate_count(db, query, table_name, filtered)
+        if estimate is not None:
+            return estimate, False
+    return db.scalar(select(func.count()).select_from(query.order_by(None).subquery())), True
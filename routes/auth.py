@@ -1,15 +1,33 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from database import get_db
 import models
-from auth import hash_password, verify_password, create_access_token
+from auth import (
+    hash_password_async, verify_password_async, create_access_token, PasswordPoolBusy
+)
 from schemas import UserSignup, UserResponse, UserLogin, TokenOut
 import os
 from limiter import limiter
 
 router = APIRouter()
+
+
+async def run_password_job(job, *args, busy_detail: str):
+    """Awaits a bcrypt job on the password pool; answers 503 (with `busy_detail`) when the pool is saturated."""
+    try:
+        return await job(*args)
+    except PasswordPoolBusy:
+        raise HTTPException(
+            status_code=503,
+            detail=busy_detail,
+            headers={"Retry-After": "1"}
+        )
+
 # --------------------------
 # AUTHENTIFICATION
+# Async handlers: the bcrypt work is awaited on the password pool,
+# the (short) DB calls go through the threadpool.
 # --------------------------
 @router.post(
     "/auth/signup", tags=["Auth"],
@@ -17,19 +35,24 @@ router = APIRouter()
     status_code=status.HTTP_201_CREATED
 )
 @limiter.limit("5/minute" if os.getenv("TESTING") != "true" else "1000/minute") # Maximum 5 signups / minute
-def signup(
+async def signup(
         request: Request,
         user: UserSignup, db: Session = Depends(get_db)
 ):
     """Create a new user account."""
-    existing_user = db.query(models.User).filter(
-        models.User.username == user.username
-    ).first()
+    existing_user = await run_in_threadpool(
+        lambda: db.query(models.User).filter(
+            models.User.username == user.username
+        ).first()
+    )
 
     if existing_user:
         raise HTTPException(status_code=400, detail="Username already taken")
 
-    hashed = hash_password(user.password)
+    hashed = await run_password_job(
+        hash_password_async, user.password,
+        busy_detail="Too many signups in progress, please retry"
+    )
 
     db_user = models.User(
         username=user.username,
@@ -38,9 +61,12 @@ def signup(
         is_admin = False,
     )
 
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    def save():
+        db.add(db_user)
+        db.commit()
+        db.refresh(db_user)
+
+    await run_in_threadpool(save)
 
     return db_user
 
@@ -49,24 +75,29 @@ def signup(
     response_model=TokenOut,
     status_code=status.HTTP_200_OK
 )
-def login(
+async def login(
         credentials: UserLogin,
         db: Session = Depends(get_db)
 ):
     """Log in and receive a JWT token."""
 
-    user = db.query(models.User).filter(
-        models.User.username == credentials.username
-    ).first()
+    user = await run_in_threadpool(
+        lambda: db.query(models.User).filter(
+            models.User.username == credentials.username
+        ).first()
+    )
 
     if not user:
         raise HTTPException(status_code=401, detail="Incorrect username or password")
 
-    if not verify_password(credentials.password, user.password_hash):
+    if not await run_password_job(
+            verify_password_async, credentials.password, user.password_hash,
+            busy_detail="Too many login attempts in progress, please retry"
+    ):
         raise HTTPException(status_code=401, detail="Incorrect username or password")
 
     token = create_access_token(data={"user_id": user.id})
 
     return {
         "access_token": token
-    }
\ No newline at end of file
+    }
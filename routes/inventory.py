@@ -1,11 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import select
 from sqlalchemy.orm import Session, joinedload
-from database import get_db
-from dependencies import get_current_admin, get_current_user
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db, get_async_db, run_sync
+from dependencies import CurrentUser, get_current_admin, get_current_user, get_current_admin_async, get_current_user_async
 from schemas import InventoryOut, InventoryItemOut, InventoryItemPlayerOut
+from menu_catalog import menu_catalog
+from etags import PLAYER_CACHE_CONTROL, conditional_response, weak_etag
+from game_utils import bump_state_version
 import models
 
 router = APIRouter()
+async_router = APIRouter()
 
 # ----------------------
 # CRUD INVENTORY
@@ -17,22 +23,33 @@ router = APIRouter()
     status_code=status.HTTP_200_OK
 )
 def list_inventory(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Check the inventory of products that the cafe has in stock."""
+    # The product names come from the catalog: its fingerprint is part of the ETag
+    state_version = db.scalar(select(models.User.state_version).where(models.User.id == current_user.id))
+    # Deleted meanwhile: another worker may still cache the identity
+    if state_version is None:
+        raise HTTPException(status_code=401, detail="User not found")
+    etag = weak_etag("inventory", current_user.id, state_version, menu_catalog.snapshot(db).fingerprint)
+    not_modified = conditional_response(request, response, etag, PLAYER_CACHE_CONTROL)
+    if not_modified:
+        return not_modified
 
     inventory_items = (
         db.query(models.Inventory)
-        .options(joinedload(models.Inventory.menu_item))
         .filter(models.Inventory.user_id == current_user.id)
         .all()
     )
+    menu_items = menu_catalog.get_many(db, (inv.menu_item_id for inv in inventory_items))
 
     items = [
         InventoryItemPlayerOut(
             menu_item_id=inv.menu_item_id,
-            product_name=inv.menu_item.name,
+            product_name=menu_items[inv.menu_item_id].name,
             quantity=inv.quantity
         )
         for inv in inventory_items
@@ -49,7 +66,7 @@ def list_inventory(
 )
 def read_inventory(item_id: int,
                    db: Session = Depends(get_db),
-                   current_user: models.User = Depends(get_current_user)
+                   current_user: CurrentUser = Depends(get_current_user)
 ):
     """Retrieves an inventory item by its ID."""
     item = db.query(models.Inventory).filter(
@@ -68,7 +85,7 @@ def read_inventory(item_id: int,
 def admin_delete_inventory(
         item_id: int,
         db: Session = Depends(get_db),
-        current_admin: models.User = Depends(get_current_admin)
+        current_admin: CurrentUser = Depends(get_current_admin)
 ):
     """Deletes any inventory item (admin only)."""
 
@@ -84,6 +101,7 @@ def admin_delete_inventory(
         raise HTTPException(status_code=404, detail="Inventory item not found")
 
     db.delete(db_item)
+    bump_state_version(db, [db_item.user_id])
     db.commit()
 
     return {
@@ -95,3 +113,49 @@ def admin_delete_inventory(
             "owner": db_item.user.username if db_item.user else "Unknown"
         }
     }
+
+
+# ----------------------
+# ASYNC MODE
+# ----------------------
+@async_router.get(
+    "/inventory",
+    tags=["Inventory"],
+    response_model=InventoryOut,
+    status_code=status.HTTP_200_OK
+)
+async def list_inventory_async(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """Check the inventory of products that the cafe has in stock."""
+    return await run_sync(db, list_inventory, request, response, current_user=current_user)
+
+
+@async_router.get(
+    "/inventory/{item_id}",
+    tags=["Inventory"],
+    response_model=InventoryItemOut,
+    status_code=status.HTTP_200_OK
+)
+async def read_inventory_async(item_id: int,
+                   db: AsyncSession = Depends(get_async_db),
+                   current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """Retrieves an inventory item by its ID."""
+    return await run_sync(db, read_inventory, item_id, current_user=current_user)
+
+@async_router.delete(
+    "/inventory/{item_id}",
+    tags=["Inventory"],
+    status_code=status.HTTP_200_OK
+)
+async def admin_delete_inventory_async(
+        item_id: int,
+        db: AsyncSession = Depends(get_async_db),
+        current_admin: CurrentUser = Depends(get_current_admin_async)
+):
+    """Deletes any inventory item (admin only)."""
+    return await run_sync(db, admin_delete_inventory, item_id, current_admin=current_admin)
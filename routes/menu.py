@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
-from database import get_db
-from dependencies import get_current_admin, get_current_user
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db, get_async_db, run_sync
+from dependencies import CurrentUser, get_current_admin, get_current_user, get_current_admin_async, get_current_user_async
 from schemas import MenuItemCreate, MenuItemOut, MenuListResponse, MenuItemUpdate
+from menu_catalog import menu_catalog
+from etags import MENU_CACHE_CONTROL, conditional_response, weak_etag
 import math
 import models
 
 router = APIRouter()
+async_router = APIRouter()
 # ----------------------
 # CRUD MENU
 # ----------------------
@@ -18,7 +22,7 @@ router = APIRouter()
 def create_menu_item(
         item: MenuItemCreate,
         db: Session = Depends(get_db),
-        admin: models.User = Depends(get_current_admin)
+        admin: CurrentUser = Depends(get_current_admin)
 ):
     """Creates a new menu item (admin only)."""
     db_menu_item = models.MenuItem(
@@ -27,6 +31,7 @@ def create_menu_item(
         selling_price= item.selling_price)
     db.add(db_menu_item)
     db.commit()
+    menu_catalog.reload(db)
     db.refresh(db_menu_item)
     return db_menu_item
 
@@ -38,14 +43,17 @@ def create_menu_item(
 )
 def read_menu_item(
         menu_id: int,
+        request: Request,
+        response: Response,
         db: Session = Depends(get_db),
-        current_user: models.User = Depends(get_current_user)
+        current_user: CurrentUser = Depends(get_current_user)
 ):
     """Retrieves a menu item by its ID."""
-    menu_item = db.query(models.MenuItem).filter(models.MenuItem.id == menu_id).first()
+    menu_item = menu_catalog.get(db, menu_id)
     if not menu_item:
         raise HTTPException(status_code=404, detail="Menu item not found")
-    return menu_item
+    etag = weak_etag("menu", menu_catalog.snapshot(db).fingerprint)
+    return conditional_response(request, response, etag, MENU_CACHE_CONTROL) or menu_item
 
 @router.get(
     "/menu", tags=["Menu"],
@@ -53,15 +61,23 @@ def read_menu_item(
     status_code=status.HTTP_200_OK
 )
 def list_menu(
+        request: Request,
+        response: Response,
         page: int = 1,
         limit: int = 20,
         db: Session = Depends(get_db),
-        current_user: models.User = Depends(get_current_user)
+        current_user: CurrentUser = Depends(get_current_user)
 ):
     """List all menu items (with pagination)."""
+    snapshot = menu_catalog.snapshot(db)
+    not_modified = conditional_response(request, response, weak_etag("menu", snapshot.fingerprint), MENU_CACHE_CONTROL)
+    if not_modified:
+        return not_modified
+
     skip = (page - 1) * limit
-    all_items = db.query(models.MenuItem).offset(skip).limit(limit).all()
-    total_items = db.query(models.MenuItem).count()
+    catalog = list(snapshot.items.values())
+    all_items = catalog[skip:skip + limit]
+    total_items = len(catalog)
     total_pages = math.ceil(total_items / limit)
 
 
@@ -80,7 +96,7 @@ def update_menu_item(
         menu_id: int,
         menu_item: MenuItemUpdate,
         db: Session = Depends(get_db),
-        admin: models.User = Depends(get_current_admin)
+        admin: CurrentUser = Depends(get_current_admin)
 ):
     """Modifies an item in the existing menu (admin only)."""
     db_menu_item = db.query(models.MenuItem).filter(models.MenuItem.id == menu_id).first()
@@ -94,6 +110,7 @@ def update_menu_item(
         db_menu_item.selling_price = menu_item.selling_price
 
     db.commit()
+    menu_catalog.reload(db)
     db.refresh(db_menu_item)
     return db_menu_item
 
@@ -106,7 +123,7 @@ def update_menu_item(
 def delete_menu_item(
         menu_id: int,
         db: Session = Depends(get_db),
-        admin: models.User = Depends(get_current_admin)
+        admin: CurrentUser = Depends(get_current_admin)
 ):
     """Removes an item from the menu (admin only)."""
     db_menu_item = db.query(models.MenuItem).filter(models.MenuItem.id == menu_id).first()
@@ -114,4 +131,80 @@ def delete_menu_item(
         raise HTTPException(status_code=404, detail="Menu item not found")
     db.delete(db_menu_item)
     db.commit()
+    menu_catalog.reload(db)
     return {"message": "Menu item deleted"}
+
+
+# ----------------------
+# ASYNC MODE
+# ----------------------
+@async_router.post(
+    "/menu", tags=["Menu"],
+    response_model=MenuItemOut,
+    status_code=status.HTTP_201_CREATED
+)
+async def create_menu_item_async(
+        item: MenuItemCreate,
+        db: AsyncSession = Depends(get_async_db),
+        admin: CurrentUser = Depends(get_current_admin_async)
+):
+    """Creates a new menu item (admin only)."""
+    return await run_sync(db, create_menu_item, item, admin=admin)
+
+
+@async_router.get(
+    "/menu/{menu_id}",
+    tags=["Menu"], response_model=MenuItemOut,
+    status_code=status.HTTP_200_OK
+)
+async def read_menu_item_async(
+        menu_id: int,
+        request: Request,
+        response: Response,
+        db: AsyncSession = Depends(get_async_db),
+        current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """Retrieves a menu item by its ID."""
+    return await run_sync(db, read_menu_item, menu_id, request, response, current_user=current_user)
+
+@async_router.get(
+    "/menu", tags=["Menu"],
+    response_model=MenuListResponse,
+    status_code=status.HTTP_200_OK
+)
+async def list_menu_async(
+        request: Request,
+        response: Response,
+        page: int = 1,
+        limit: int = 20,
+        db: AsyncSession = Depends(get_async_db),
+        current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """List all menu items (with pagination)."""
+    return await run_sync(db, list_menu, request, response, page, limit, current_user=current_user)
+
+@async_router.put(
+    "/menu/{menu_id}",
+    tags=["Menu"], response_model=MenuItemOut)
+async def update_menu_item_async(
+        menu_id: int,
+        menu_item: MenuItemUpdate,
+        db: AsyncSession = Depends(get_async_db),
+        admin: CurrentUser = Depends(get_current_admin_async)
+):
+    """Modifies an item in the existing menu (admin only)."""
+    return await run_sync(db, update_menu_item, menu_id, menu_item, admin=admin)
+
+
+@async_router.delete(
+    "/menu/{menu_id}",
+    tags=["Menu"],
+    status_code=status.HTTP_200_OK
+)
+async def delete_menu_item_async(
+        menu_id: int,
+        db: AsyncSession = Depends(get_async_db),
+        admin: CurrentUser = Depends(get_current_admin_async)
+):
+    """Removes an item from the menu (admin only)."""
+    return await run_sync(db, delete_menu_item, menu_id, admin=admin)
@@ -1,14 +1,55 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
-from database import get_db
-from dependencies import get_current_admin, get_current_user
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, insert, select, tuple_, update
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db, get_async_db, run_sync
+from dependencies import CurrentUser, get_current_admin, get_current_user, get_current_admin_async, get_current_user_async
 from game_utils import log_action
-from schemas import OrderCreate, OrderCreatedOut, OrderDetailOut, OrderStatusOut, PaginatedAdminOrdersOut, OrderStatusEnum
+from menu_catalog import menu_catalog
+from pagination import count_rows, decode_cursor, encode_cursor
+from schemas import OrderCreate, OrderCreatedOut, OrderBulkCreate, OrderBulkCreatedOut, OrderDetailOut, OrderStatusOut, PaginatedAdminOrdersOut, OrderStatusEnum, PaginatedOrdersOut, OrderSummaryOut, OrderedItemOut
 import models
 from decimal import Decimal
 import math
 
 router = APIRouter()
+async_router = APIRouter()
+
+def load_menu_items(db: Session, orders: list[OrderCreate]) -> dict:
+    """All the products referenced by the orders, from the menu catalog."""
+    return menu_catalog.get_many(db, (item.menu_item_id for order in orders for item in order.items))
+
+def insert_orders(db: Session, user_id: int, orders: list[OrderCreate], menu_items: dict) -> list[int]:
+    """
+    Inserts PENDING orders and their lines with one multi-row insert per table,
+    and journals their order_created logs. Returns the order ids, in order.
+    """
+    order_ids = db.execute(
+        insert(models.Order).returning(models.Order.id, sort_by_parameter_order=True),
+        [{"user_id": user_id, "status": models.OrderStatus.PENDING} for _ in orders]
+    ).scalars().all()
+
+    order_lines = []
+    for order_id, order_data in zip(order_ids, orders):
+        for item in order_data.items:
+            order_lines.append(
+                {"order_id": order_id,
+                 "menu_item_id": item.menu_item_id,
+                 "quantity": item.quantity,
+                 "unit_price": menu_items[item.menu_item_id].selling_price,
+                 "menu_item_name": menu_items[item.menu_item_id].name}
+            )
+            log_action(
+                db=db,
+                user_id=user_id,
+                action_type="order_created",
+                message=f"New order : {item.quantity}x {menu_items[item.menu_item_id].name}"
+            )
+
+    if order_lines:
+        db.execute(insert(models.OrderItem), order_lines)
+
+    return order_ids
 
 # ----------------------
 # CRUD CLIENT'S ORDER
@@ -19,62 +60,119 @@ router = APIRouter()
 def order_for_client(
         order_data: OrderCreate,
         db: Session = Depends(get_db),
-        current_user: models.User = Depends(get_current_user)
+        current_user: CurrentUser = Depends(get_current_user)
 ):
     """Place an order for a customer. The order is placed on hold."""
 
-    # checks and stock
-    menu_items = {}
-    for item in order_data.items:
-        menu_item = db.query(models.MenuItem).filter(
-            models.MenuItem.id == item.menu_item_id
-        ).first()
-        if not menu_item:
-            raise HTTPException(status_code=404, detail="Item not found")
-        menu_items[item.menu_item_id] = menu_item
+    # checks: all the products, from the menu catalog
+    menu_items = load_menu_items(db, [order_data])
+    if any(item.menu_item_id not in menu_items for item in order_data.items):
+        raise HTTPException(status_code=404, detail="Item not found")
 
     #  Create the order only if everything is valid
-    order = models.Order(
-        user_id=current_user.id,
-        status=models.OrderStatus.PENDING
-    )
-    db.add(order)
-    db.flush()
-
-    # Create the command lines
-    response_items = []
-    for item in order_data.items:
-        menu_item = menu_items[item.menu_item_id]  #  already in memory
-
-        order_item = models.OrderItem(
-            order_id=order.id,
-            menu_item_id=item.menu_item_id,
-            quantity=item.quantity,
-        )
-        db.add(order_item)
+    order_id, = insert_orders(db, current_user.id, [order_data], menu_items)
+    db.commit()
 
-        response_items.append(
-            {"menu_item_name": menu_item.name,
-             "menu_item_id": menu_item.id,
-             "quantity": item.quantity}
-        )
+    response_items = [
+        {"menu_item_name": menu_items[item.menu_item_id].name,
+         "menu_item_id": item.menu_item_id,
+         "quantity": item.quantity}
+        for item in order_data.items
+    ]
 
-        log_action(
-            db=db,
-            user_id=current_user.id,
-            action_type="order_created",
-            message=f"New order : {item.quantity}x {menu_item.name}"
-        )
+    return {
+        "message": "Order placed",
+        "order_id": order_id,
+        "items": response_items
+    }
 
+
+@router.post(
+    "/order/client/bulk", tags=["Order"],
+    response_model=OrderBulkCreatedOut)
+def order_for_client_bulk(
+        bulk_data: OrderBulkCreate,
+        db: Session = Depends(get_db),
+        current_user: CurrentUser = Depends(get_current_user)
+):
+    """
+    Place several customer orders in one transaction. The orders are placed on hold.
+    An unknown product rejects the whole batch, unless allow_partial is set:
+    the valid orders are then created and the others reported in errors.
+    """
+    menu_items = load_menu_items(db, bulk_data.orders)
+
+    errors = [
+        {"index": index, "detail": "Item not found"}
+        for index, order_data in enumerate(bulk_data.orders)
+        if any(item.menu_item_id not in menu_items for item in order_data.items)
+    ]
+    if errors and not bulk_data.allow_partial:
+        raise HTTPException(status_code=404, detail="Item not found")
+
+    rejected = {error["index"] for error in errors}
+    valid_orders = [order for index, order in enumerate(bulk_data.orders) if index not in rejected]
+
+    created_ids = iter(insert_orders(db, current_user.id, valid_orders, menu_items) if valid_orders else [])
     db.commit()
 
     return {
-        "message": "Order placed",
-        "order_id": order.id,
-        "items": response_items
+        "message": f"{len(valid_orders)} order(s) placed",
+        "order_ids": [None if index in rejected else next(created_ids) for index in range(len(bulk_data.orders))],
+        "errors": errors
     }
 
 
+@router.get("/orders", tags=["Order"], response_model=PaginatedOrdersOut)
+def list_my_orders(
+        limit: int = Query(20, ge=1, le=100),
+        cursor: str | None = None,
+        status: OrderStatusEnum | None = None,
+        include: str | None = Query(None, pattern="^items$", description="`items` to add the lines of each order"),
+        archived: bool = Query(False, description="list the archived orders instead of the live ones"),
+        db: Session = Depends(get_db),
+        current_user: CurrentUser = Depends(get_current_user)
+):
+    """
+    The player's orders, newest first. Pass `next_cursor` back as `cursor` for the next page.
+    Finished orders move to the archive after ORDER_ARCHIVE_DAYS: list them with `archived=true`.
+    """
+    order_model, item_model = (models.OrderArchive, models.OrderItemArchive) if archived else (models.Order, models.OrderItem)
+    query = (
+        select(order_model)
+        .where(order_model.user_id == current_user.id)
+        .order_by(order_model.created_at.desc(), order_model.id.desc())
+    )
+    if status:
+        query = query.where(order_model.status == status)
+    if cursor:
+        created_at, order_id = decode_cursor(cursor)
+        query = query.where(tuple_(order_model.created_at, order_model.id) < (created_at, order_id))
+
+    # One extra row tells whether there is a next page
+    orders = db.scalars(query.limit(limit + 1)).all()
+    next_cursor = None
+    if len(orders) > limit:
+        orders = orders[:limit]
+        next_cursor = encode_cursor(orders[-1].created_at, orders[-1].id)
+
+    items = [OrderSummaryOut(id=order.id, status=order.status, created_at=order.created_at) for order in orders]
+    if include == "items" and orders:
+        # The lines of the whole page in one IN query
+        lines = db.scalars(
+            select(item_model)
+            .where(item_model.order_id.in_([order.id for order in orders]))
+            .order_by(item_model.id)
+        ).all()
+        by_order = {order.id: [] for order in orders}
+        for line in lines:
+            by_order[line.order_id].append(OrderedItemOut.model_validate(line))
+        for summary in items:
+            summary.items = by_order[summary.id]
+
+    return PaginatedOrdersOut(limit=limit, next_cursor=next_cursor, items=items)
+
+
 @router.get(
     "/orders/{order_id}",
     tags=["Order"],
@@ -82,12 +180,17 @@ def order_for_client(
 def read_order(
         order_id: int,
         db: Session = Depends(get_db),
-        current_user: models.User = Depends(get_current_user)
+        current_user: CurrentUser = Depends(get_current_user)
 ):
-    """View order details."""
-    order = (db.query(models.Order)
-             .filter(models.Order.id == order_id)
+    """View order details, archived orders included."""
+    order_model, item_model = models.Order, models.OrderItem
+    order = (db.query(order_model)
+             .filter(order_model.id == order_id)
              .first())
+    if not order:
+        # Finished orders are moved to the archive after a while
+        order_model, item_model = models.OrderArchive, models.OrderItemArchive
+        order = db.get(order_model, order_id)
 
     # Verification:
     if not order:
@@ -95,16 +198,15 @@ def read_order(
     if order.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not your order")
 
-    items = (db.query(models.OrderItem)
-             .options(joinedload(models.OrderItem.menu_item))
-             .filter(models.OrderItem.order_id == order_id)
+    items = (db.query(item_model)
+             .filter(item_model.order_id == order_id)
              .all())
 
     items_response = []
     for item in items:
         items_response.append(
-            {"menu_item_id": item.menu_item.id,
-             "menu_item_name": item.menu_item.name,
+            {"menu_item_id": item.menu_item_id,
+             "menu_item_name": item.menu_item_name,
              "quantity": item.quantity}
         )
 
@@ -117,11 +219,16 @@ def read_order(
 def complete_order(
     order_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Changes the status of an order from PENDING to COMPLETED. Removes the stock, adds the money to the player, and logs the action."""
 
-    order = db.query(models.Order).filter(models.Order.id == order_id).first()
+    # Lock the order: a concurrent complete/cancel waits, then sees it is no longer pending
+    order = (db.query(models.Order)
+             .filter(models.Order.id == order_id)
+             .with_for_update()
+             .populate_existing()
+             .first())
     # Verification:
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
@@ -130,37 +237,53 @@ def complete_order(
     if order.status != models.OrderStatus.PENDING:
         raise HTTPException(status_code=400, detail="Order is not pending")
 
-    order_items = (db.query(models.OrderItem).
-                   options(joinedload(models.OrderItem.menu_item))
-                   .filter(models.OrderItem.order_id == order_id)
-                   .all())
-
-    total = Decimal("0.00")
-    for item in order_items:
-        inventory = (db.query(models.Inventory).filter(
-            models.Inventory.user_id == current_user.id,
-            models.Inventory.menu_item_id == item.menu_item_id
+    # Order lines at the prices captured when the order was placed; the order total is summed by the DB
+    amount = (models.OrderItem.unit_price * models.OrderItem.quantity).label("amount")
+    order_items = db.execute(
+        select(
+            models.OrderItem.menu_item_id,
+            models.OrderItem.quantity,
+            models.OrderItem.menu_item_name,
+            amount,
+            func.sum(amount).over().label("total")
         )
-        .with_for_update()
-        .first())
-
-        if not inventory or inventory.quantity < item.quantity:
-            raise HTTPException(status_code=400, detail="Not enough stock")
-
-        #Effect
-        amount = item.menu_item.selling_price * item.quantity
-        total+=amount
-        log_action(
-            db=db,
-            user_id=current_user.id,
-            action_type="order_completed",
-            message=f"Commande complétée : {item.quantity}x {item.menu_item.name} (+{amount}€)"
+        .where(models.OrderItem.order_id == order_id)
+    ).all()
+    total = order_items[0].total if order_items else Decimal("0.00")
+
+    # Remove the stock of every product in one statement, only where there is enough of it
+    needed = (
+        select(
+            models.OrderItem.menu_item_id,
+            func.sum(models.OrderItem.quantity).label("quantity")
         )
-        inventory.quantity -= item.quantity
-
+        .where(models.OrderItem.order_id == order_id)
+        .group_by(models.OrderItem.menu_item_id)
+        .subquery()
+    )
+    updated = db.execute(
+        update(models.Inventory)
+        .where(
+            models.Inventory.user_id == current_user.id,
+            models.Inventory.menu_item_id == needed.c.menu_item_id,
+            models.Inventory.quantity >= needed.c.quantity
+        )
+        .values(quantity=models.Inventory.quantity - needed.c.quantity)
+        .returning(models.Inventory.menu_item_id)
+    ).all()
 
+    if len(updated) != len({item.menu_item_id for item in order_items}):
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Not enough stock")
 
     try:
+        for item in order_items:
+            log_action(
+                db=db,
+                user_id=current_user.id,
+                action_type="order_completed",
+                message=f"Commande complétée : {item.quantity}x {item.menu_item_name} (+{item.amount}€)"
+            )
         log_action(
             db=db,
             user_id=current_user.id,
@@ -169,8 +292,14 @@ def complete_order(
             amount=total
         )
 
+        # Credit the player atomically (the cached identity carries no balance)
+        db.execute(
+            update(models.User)
+            .where(models.User.id == current_user.id)
+            .values(money=models.User.money + total)
+        )
+
         order.status = models.OrderStatus.COMPLETED
-        current_user.money += total
         db.commit()
 
     except Exception as e:
@@ -186,12 +315,16 @@ def complete_order(
 def cancel_order(
     order_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Changes the status of an order from PENDING to CANCELLED. The player failed to complete the order in time; the order is canceled."""
 
-    #Checks
-    order = db.query(models.Order).filter(models.Order.id == order_id).first()
+    #Checks (on the locked order: a concurrent complete/cancel or the expiry job waits, then sees it is no longer pending)
+    order = (db.query(models.Order)
+             .filter(models.Order.id == order_id)
+             .with_for_update()
+             .populate_existing()
+             .first())
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     if order.user_id != current_user.id:
@@ -221,35 +354,156 @@ def cancel_order(
 
 @router.get("/admin/orders", tags=["Order"], response_model=PaginatedAdminOrdersOut)
 def list_all_orders(
-    page: int = 1,
-    limit: int = 20,
+    page: int = Query(1, ge=1),
+    limit: int = Query(20, ge=1, le=500),
+    cursor: str | None = None,
+    exact_count: bool = False,
     status: OrderStatusEnum | None = None,
     user_id: int | None = None,
+    archived: bool = Query(False, description="list the archived orders instead of the live ones"),
     db: Session = Depends(get_db),
-    current_admin: models.User = Depends(get_current_admin)
+    current_admin: CurrentUser = Depends(get_current_admin)
 ):
-    """Lists all commands for all players (admin only)."""
-
-    query = db.query(models.Order)
+    """
+    Lists all commands for all players (admin only), newest first.
+    Pass `next_cursor` back as `cursor` for the next page: every page costs the same.
+    `page` > 1 without a cursor is kept for older clients (OFFSET, slower on deep pages).
+    `total_items` is the planner's estimate unless `exact_count` is set (see total_exact).
+    Finished orders move to the archive after ORDER_ARCHIVE_DAYS: list them with `archived=true`.
+    """
+    order_model = models.OrderArchive if archived else models.Order
+    query = select(order_model)
     if status:
-        query = query.filter(models.Order.status == status)
+        query = query.where(order_model.status == status)
     if user_id is not None:
-        query = query.filter(models.Order.user_id == user_id)
-
-    total_items = query.count()
+        query = query.where(order_model.user_id == user_id)
 
-    orders = (
-        query
-        .order_by(models.Order.created_at.desc())
-        .limit(limit)
-        .offset((page - 1) * limit)
-        .all()
+    total_items, total_exact = count_rows(
+        db, query, order_model.__tablename__,
+        filtered=status is not None or user_id is not None, exact=exact_count
     )
 
+    query = query.order_by(order_model.created_at.desc(), order_model.id.desc())
+    if cursor:
+        created_at, order_id = decode_cursor(cursor)
+        query = query.where(tuple_(order_model.created_at, order_model.id) < (created_at, order_id))
+    elif page > 1:
+        query = query.offset((page - 1) * limit)
+
+    # One extra row tells whether there is a next page
+    orders = db.scalars(query.limit(limit + 1)).all()
+    next_cursor = None
+    if len(orders) > limit:
+        orders = orders[:limit]
+        next_cursor = encode_cursor(orders[-1].created_at, orders[-1].id)
+
     return {
         "page": page,
         "limit": limit,
         "total_items": total_items,
-        "total_pages": math.ceil(total_items / limit) if limit > 0 else 0,
+        "total_pages": math.ceil(total_items / limit),
+        "total_exact": total_exact,
+        "next_cursor": next_cursor,
         "items": orders
-    }
\ No newline at end of file
+    }
+
+
+# ----------------------
+# ASYNC MODE
+# ----------------------
+@async_router.post(
+    "/order/client", tags=["Order"],
+    response_model=OrderCreatedOut)
+async def order_for_client_async(
+        order_data: OrderCreate,
+        db: AsyncSession = Depends(get_async_db),
+        current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """Place an order for a customer. The order is placed on hold."""
+    return await run_sync(db, order_for_client, order_data, current_user=current_user)
+
+
+@async_router.post(
+    "/order/client/bulk", tags=["Order"],
+    response_model=OrderBulkCreatedOut)
+async def order_for_client_bulk_async(
+        bulk_data: OrderBulkCreate,
+        db: AsyncSession = Depends(get_async_db),
+        current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """Place several customer orders in one transaction. The orders are placed on hold."""
+    return await run_sync(db, order_for_client_bulk, bulk_data, current_user=current_user)
+
+
+@async_router.get("/orders", tags=["Order"], response_model=PaginatedOrdersOut)
+async def list_my_orders_async(
+        limit: int = Query(20, ge=1, le=100),
+        cursor: str | None = None,
+        status: OrderStatusEnum | None = None,
+        include: str | None = Query(None, pattern="^items$", description="`items` to add the lines of each order"),
+        archived: bool = Query(False, description="list the archived orders instead of the live ones"),
+        db: AsyncSession = Depends(get_async_db),
+        current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """
+    The player's orders, newest first. Pass `next_cursor` back as `cursor` for the next page.
+    Finished orders move to the archive after ORDER_ARCHIVE_DAYS: list them with `archived=true`.
+    """
+    return await run_sync(
+        db, list_my_orders,
+        limit=limit, cursor=cursor, status=status, include=include, archived=archived, current_user=current_user
+    )
+
+
+@async_router.get(
+    "/orders/{order_id}",
+    tags=["Order"],
+    response_model=OrderDetailOut)
+async def read_order_async(
+        order_id: int,
+        db: AsyncSession = Depends(get_async_db),
+        current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """View order details, archived orders included."""
+    return await run_sync(db, read_order, order_id, current_user=current_user)
+
+@async_router.patch("/orders/{order_id}/complete", tags=["Order"], response_model=OrderStatusOut)
+async def complete_order_async(
+    order_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """Changes the status of an order from PENDING to COMPLETED. Removes the stock, adds the money to the player, and logs the action."""
+    return await run_sync(db, complete_order, order_id, current_user=current_user)
+
+@async_router.patch("/orders/{order_id}/cancel", tags=["Order"], response_model=OrderStatusOut)
+async def cancel_order_async(
+    order_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """Changes the status of an order from PENDING to CANCELLED. The player failed to complete the order in time; the order is canceled."""
+    return await run_sync(db, cancel_order, order_id, current_user=current_user)
+
+@async_router.get("/admin/orders", tags=["Order"], response_model=PaginatedAdminOrdersOut)
+async def list_all_orders_async(
+    page: int = Query(1, ge=1),
+    limit: int = Query(20, ge=1, le=500),
+    cursor: str | None = None,
+    exact_count: bool = False,
+    status: OrderStatusEnum | None = None,
+    user_id: int | None = None,
+    archived: bool = Query(False, description="list the archived orders instead of the live ones"),
+    db: AsyncSession = Depends(get_async_db),
+    current_admin: CurrentUser = Depends(get_current_admin_async)
+):
+    """
+    Lists all commands for all players (admin only), newest first. Pass `next_cursor` back as `cursor`.
+    Finished orders move to the archive after ORDER_ARCHIVE_DAYS: list them with `archived=true`.
+    """
+    return await run_sync(
+        db, list_all_orders,
+        page=page, limit=limit, cursor=cursor, exact_count=exact_count, status=status, user_id=user_id,
+        archived=archived,
+        current_admin=current_admin
+    )
@@ -1,12 +1,35 @@
+from collections import Counter
+
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from database import get_db
-from dependencies import get_current_user
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db, get_async_db, run_sync, dialect_insert
+from dependencies import CurrentUser, get_current_user, get_current_user_async
 from game_utils import log_action
-from schemas import InventoryItemOut, RestockCreate
+from menu_catalog import menu_catalog
+from schemas import InventoryItemOut, RestockCreate, RestockBulkCreate, RestockBulkOut
 
 import models
 router = APIRouter()
+async_router = APIRouter()
+
+
+def upsert_inventory(db: Session, user_id: int, quantities: dict[int, int]) -> list[models.Inventory]:
+    """
+    Adds stock to several products in one INSERT ... ON CONFLICT DO UPDATE
+    on (user_id, menu_item_id). Returns the updated inventory rows.
+    """
+    stmt = dialect_insert(db, models.Inventory).values([
+        {"user_id": user_id, "menu_item_id": menu_item_id, "quantity": quantity}
+        for menu_item_id, quantity in quantities.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.Inventory.user_id, models.Inventory.menu_item_id],
+        set_={"quantity": models.Inventory.quantity + stmt.excluded.quantity}
+    ).returning(models.Inventory)
+
+    return db.scalars(stmt, execution_options={"populate_existing": True}).all()
+
 # ----------------------
 # RESTOCK BY USER
 # ----------------------
@@ -14,7 +37,7 @@ router = APIRouter()
 def restock_item(
         order: RestockCreate,
         db: Session = Depends(get_db),
-        current_user: models.User = Depends(get_current_user)
+        current_user: CurrentUser = Depends(get_current_user)
 ):
     """ Place an order. This increases the player's inventory and decreases the player's money, and logs the action."""
     # Lock the user (to secure the money)
@@ -24,10 +47,11 @@ def restock_item(
         .with_for_update()
         .first()
     )
+    # Deleted meanwhile: another worker may still cache the identity
+    if user is None:
+        raise HTTPException(status_code=401, detail="User not found")
 
-    menu_item = db.query(models.MenuItem).filter(
-        models.MenuItem.id == order.menu_item_id
-    ).first()
+    menu_item = menu_catalog.get(db, order.menu_item_id)
 
     if not menu_item:
         raise HTTPException(status_code=404, detail="Product not found")
@@ -39,23 +63,8 @@ def restock_item(
 
     user.money -= amount_of_spending
 
-    #Lock the inventory if it exists
-    inventory_item = (db.query(models.Inventory).filter(
-        models.Inventory.menu_item_id == order.menu_item_id,
-        models.Inventory.user_id == user.id
-    )
-        .with_for_update()
-        .first())
-
-    if not inventory_item:
-        inventory_item = models.Inventory(
-            menu_item_id=order.menu_item_id,
-            quantity=order.quantity,
-            user_id=current_user.id
-        )
-        db.add(inventory_item)
-    else:
-        inventory_item.quantity += order.quantity
+    # Create or add to the stock row in one statement (no select-then-insert race)
+    inventory_item, = upsert_inventory(db, user.id, {order.menu_item_id: order.quantity})
 
     log_action(
         db=db,
@@ -68,4 +77,85 @@ def restock_item(
     db.commit()
     db.refresh(inventory_item)
 
-    return inventory_item
\ No newline at end of file
+    return inventory_item
+
+
+@router.post("/order/restock/bulk", tags=["Restock"], response_model=RestockBulkOut)
+def restock_items_bulk(
+        order: RestockBulkCreate,
+        db: Session = Depends(get_db),
+        current_user: CurrentUser = Depends(get_current_user)
+):
+    """Restock several products in one transaction. The money check covers the whole batch."""
+    # Lock the user once for the whole batch
+    user = (
+        db.query(models.User)
+        .filter(models.User.id == current_user.id)
+        .with_for_update()
+        .first()
+    )
+    # Deleted meanwhile: another worker may still cache the identity
+    if user is None:
+        raise HTTPException(status_code=401, detail="User not found")
+
+    # The same product can be listed twice
+    quantities = Counter()
+    for item in order.items:
+        quantities[item.menu_item_id] += item.quantity
+
+    menu_items = menu_catalog.get_many(db, quantities)
+    if len(menu_items) != len(quantities):
+        raise HTTPException(status_code=404, detail="Product not found")
+
+    costs = {
+        menu_item_id: menu_items[menu_item_id].purchase_price * quantity
+        for menu_item_id, quantity in quantities.items()
+    }
+    amount_of_spending = sum(costs.values())
+
+    if user.money < amount_of_spending:
+        raise HTTPException(status_code=400, detail="Not enough money!")
+
+    user.money -= amount_of_spending
+
+    inventory_items = upsert_inventory(db, user.id, quantities)
+    response_items = [InventoryItemOut.model_validate(item) for item in inventory_items]
+
+    # Journaled: one log insert and one progress update at commit, whatever the batch size
+    for menu_item_id, quantity in quantities.items():
+        log_action(
+            db=db,
+            user_id=user.id,
+            action_type="restock",
+            message=f"Restock : {quantity}x {menu_items[menu_item_id].name} → -{costs[menu_item_id]:.2f}€",
+            amount=-costs[menu_item_id]
+        )
+
+    db.commit()
+
+    return {
+        "total_cost": amount_of_spending,
+        "items": response_items
+    }
+
+
+# ----------------------
+# ASYNC MODE
+# ----------------------
+@async_router.post("/order/restock", tags=["Restock"], response_model=InventoryItemOut)
+async def restock_item_async(
+        order: RestockCreate,
+        db: AsyncSession = Depends(get_async_db),
+        current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """ Place an order. This increases the player's inventory and decreases the player's money, and logs the action."""
+    return await run_sync(db, restock_item, order, current_user=current_user)
+
+@async_router.post("/order/restock/bulk", tags=["Restock"], response_model=RestockBulkOut)
+async def restock_items_bulk_async(
+        order: RestockBulkCreate,
+        db: AsyncSession = Depends(get_async_db),
+        current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """Restock several products in one transaction. The money check covers the whole batch."""
+    return await run_sync(db, restock_items_bulk, order, current_user=current_user)
@@ -1,12 +1,91 @@
-from fastapi import APIRouter, Depends
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from database import get_db
-from dependencies import get_current_admin, get_current_user
-from schemas import GameHistoryOut, PlayerHistoryInfo, PlayerStatsOut, PlayerStatsInfo, PlayerStatsDetails
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db, get_async_db, run_sync
+from dependencies import CurrentUser, get_current_admin, get_current_user, get_current_admin_async, get_current_user_async
+from schemas import GameHistoryOut, GameLogOut, PlayerHistoryInfo, PlayerStatsOut, PlayerStatsInfo, PlayerStatsDetails, LevelRecomputeOut, PlayerTimeseriesOut, StatsBucketEnum, LeaderboardOut
+from sqlalchemy import String, case, cast, func, insert, literal, select, tuple_, update
+from levels import level_curve
+from leaderboard import leaderboard
+from global_stats import global_stats
+from etags import PLAYER_CACHE_CONTROL, conditional_response, weak_etag
+from game_utils import bump_state_version
+from menu_catalog import menu_catalog
+from jobs import order_expiry
+from pagination import encode_cursor, decode_cursor
+from cache import user_cache, token_cache
+from auth import password_pool
+import gamelog_writer
 import models
 
 router = APIRouter()
+async_router = APIRouter()
+
+# Rows fetched per round trip by /game/history/stream
+HISTORY_STREAM_BATCH = 1000
+
+# /game/stats/timeseries: default window of each bucket size (days), and the longest accepted
+TIMESERIES_WINDOWS = {
+    StatsBucketEnum.DAY: 30,
+    StatsBucketEnum.WEEK: 12 * 7,
+    StatsBucketEnum.MONTH: 365,
+}
+MAX_TIMESERIES_DAYS = 5 * 366
+
+
+def as_utc(value: datetime) -> datetime:
+    """Naive datetimes are read as UTC."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def bucket_start(day: date, bucket: StatsBucketEnum) -> date:
+    if bucket == StatsBucketEnum.WEEK:
+        return day - timedelta(days=day.weekday())
+    if bucket == StatsBucketEnum.MONTH:
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(start: date, bucket: StatsBucketEnum) -> date:
+    if bucket == StatsBucketEnum.WEEK:
+        return start + timedelta(days=7)
+    if bucket == StatsBucketEnum.MONTH:
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def leaderboard_response(limit: int, user_id: int) -> dict:
+    """Reads the in-memory leaderboard only."""
+    mine = leaderboard.rank(user_id)
+    return {
+        "total_players": len(leaderboard),
+        "top": [
+            {"rank": rank, "username": entry.username,
+             "total_money_earned": entry.total_money_earned, "level": entry.level}
+            for rank, entry in enumerate(leaderboard.top(limit), start=1)
+        ],
+        "me": None if mine is None else {
+            "rank": mine[0], "username": mine[1].username,
+            "total_money_earned": mine[1].total_money_earned, "level": mine[1].level
+        }
+    }
+
+
+def history_query(user_id: int, action_type: str | None, since: datetime | None, until: datetime | None):
+    """The player's logs, newest first (served by ix_gamelog_user_id_timestamp)."""
+    query = select(models.GameLog).where(models.GameLog.user_id == user_id)
+    if action_type:
+        query = query.where(models.GameLog.action_type == action_type)
+    if since:
+        query = query.where(models.GameLog.timestamp >= as_utc(since))
+    if until:
+        query = query.where(models.GameLog.timestamp < as_utc(until))
+    return query.order_by(models.GameLog.timestamp.desc(), models.GameLog.id.desc())
 
 # --------------------------
 # CRUD FOR GAME STATISTICS
@@ -14,67 +93,156 @@ router = APIRouter()
 
 @router.get("/admin/stats", tags=["Stats"])
 def get_global_stats(
+        fresh: bool = Query(False, description="Recompute now instead of serving the last snapshot"),
         db: Session = Depends(get_db),
-        current_admin: models.User = Depends(get_current_admin)
+        current_admin: CurrentUser = Depends(get_current_admin)
 ):
-    """Overall game statistics (admin only)."""
+    """Overall game statistics (admin only), from a snapshot refreshed in the background (see generated_at)."""
+    return global_stats.get(db, fresh=fresh)
 
-    # Count users
-    total_users = db.query(models.User).count()
-    total_admins = db.query(models.User).filter(models.User.is_admin == True).count()
+@router.post("/admin/levels/recompute", tags=["Stats"], response_model=LevelRecomputeOut)
+def recompute_levels(
+        db: Session = Depends(get_db),
+        current_admin: CurrentUser = Depends(get_current_admin)
+):
+    """Re-levels every player with the current level curve (admin only). Players going up get a level_up log."""
+    progress = models.PlayerProgress
+    current_level = func.coalesce(progress.current_level, 1)
+    new_level = level_curve.level_expression(
+        func.coalesce(progress.total_money_earned, 0),
+        func.coalesce(progress.total_orders, 0)
+    )
 
-    # Count the products
-    total_menu_items = db.query(models.MenuItem).count()
+    # 1. The level_up logs, in one INSERT ... SELECT (the rows stay locked until commit)
+    risen = select(
+        progress.user_id,
+        literal("level_up"),
+        literal("Congrats! Level ") + cast(new_level, String) + literal(" achieved !")
+    ).where(new_level > current_level).with_for_update()
+    level_ups = db.execute(
+        insert(models.GameLog).from_select(["user_id", "action_type", "message"], risen)
+    ).rowcount
 
-    # Count orders
-    total_orders = db.query(models.Order).count()
+    # 2. New ETags for the players re-leveled, then every level that changed in one UPDATE
+    # (the SET reads the levels before the update)
+    bump_state_version(db, select(progress.user_id).where(new_level != current_level))
+    updated = db.execute(
+        update(progress)
+        .where(new_level != current_level)
+        .values(
+            current_level=new_level,
+            total_actions=progress.total_actions + case((new_level > current_level, 1), else_=0)
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
 
-    # Total cash in circulation
-    total_money = db.query(models.User).with_entities(
-        func.sum(models.User.money)
-    ).scalar() or 0
+    db.commit()
+    if updated and leaderboard.warmed:
+        leaderboard.load(db)
 
     return {
-        "users": {
-            "total": total_users,
-            "admins": total_admins,
-            "players": total_users - total_admins
-        },
-        "game": {
-            "total_menu_items": total_menu_items,
-            "total_orders": total_orders,
-            "total_money_in_game": round(total_money, 2)
-        }
+        "updated": updated,
+        "level_ups": level_ups
+    }
+
+@router.get("/admin/metrics", tags=["Stats"])
+def get_metrics(
+        current_admin: CurrentUser = Depends(get_current_admin)
+):
+    """In-process counters of this worker: caches, password pool, log writer, leaderboard, menu catalog and order expiry (admin only)."""
+    return {
+        "user_cache": user_cache.stats(),
+        "token_cache": token_cache.stats(),
+        "password_pool": password_pool.stats(),
+        "gamelog_writer": gamelog_writer.writer.stats(),
+        "leaderboard": leaderboard.stats(),
+        "menu_catalog": menu_catalog.stats(),
+        "order_expiry": order_expiry.expirer.stats()
     }
 
 @router.get("/game/history", tags=["Stats"], response_model=GameHistoryOut)
 def get_game_history(
+        limit: int = Query(50, ge=1, le=500),
+        cursor: str | None = None,
+        action_type: str | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
         db: Session = Depends(get_db),
-        current_user: models.User = Depends(get_current_user)
+        current_user: CurrentUser = Depends(get_current_user)
 ):
-    """Retrieves the player's complete action history."""
+    """Retrieves the player's action history, newest first. Pass `next_cursor` back as `cursor` for the next page."""
 
-    logs = db.query(models.GameLog).filter(
-        models.GameLog.user_id == current_user.id
-    ).order_by(
-        models.GameLog.timestamp.desc()
-    ).all()
+    player = db.query(
+        models.User.username,
+        models.User.money,
+        models.PlayerProgress.total_actions
+    ).outerjoin(
+        models.PlayerProgress, models.PlayerProgress.user_id == models.User.id
+    ).filter(models.User.id == current_user.id).first()
+    # Deleted meanwhile: another worker may still cache the identity
+    if player is None:
+        raise HTTPException(status_code=401, detail="User not found")
+
+    query = history_query(current_user.id, action_type, since, until)
+    if cursor:
+        timestamp, log_id = decode_cursor(cursor)
+        query = query.where(tuple_(models.GameLog.timestamp, models.GameLog.id) < (timestamp, log_id))
+
+    # One extra row tells whether there is a next page
+    logs = db.scalars(query.limit(limit + 1)).all()
+    next_cursor = None
+    if len(logs) > limit:
+        logs = logs[:limit]
+        next_cursor = encode_cursor(logs[-1].timestamp, logs[-1].id)
 
     return GameHistoryOut(
         player=PlayerHistoryInfo(
-            username=current_user.username,
-            money=current_user.money
+            username=player.username,
+            money=player.money
         ),
-        total_actions=len(logs),
-        history=logs
+        total_actions=player.total_actions or 0,
+        history=logs,
+        next_cursor=next_cursor
     )
 
+@router.get("/game/history/stream", tags=["Stats"])
+def stream_game_history(
+        action_type: str | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        db: Session = Depends(get_db),
+        current_user: CurrentUser = Depends(get_current_user)
+):
+    """The player's whole history as NDJSON (one log per line), read through a server-side cursor."""
+    query = history_query(current_user.id, action_type, since, until)
+    bind = db.get_bind()
+
+    # The body is produced after the handler returns: it reads on its own session
+    def lines():
+        with Session(bind=bind) as session:
+            logs = session.scalars(query.execution_options(yield_per=HISTORY_STREAM_BATCH))
+            for log in logs:
+                yield GameLogOut.model_validate(log).model_dump_json() + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 @router.get("/game/stats", tags=["Stats"], response_model=PlayerStatsOut)
 def get_game_stats(
+        request: Request,
+        response: Response,
         db: Session = Depends(get_db),
-        current_user: models.User = Depends(get_current_user)
+        current_user: CurrentUser = Depends(get_current_user)
 ):
     """Retrieves the player's cumulative statistics."""
+    state_version = db.scalar(select(models.User.state_version).where(models.User.id == current_user.id))
+    # Deleted meanwhile: another worker may still cache the identity
+    if state_version is None:
+        raise HTTPException(status_code=401, detail="User not found")
+    not_modified = conditional_response(
+        request, response, weak_etag("stats", current_user.id, state_version), PLAYER_CACHE_CONTROL
+    )
+    if not_modified:
+        return not_modified
 
     # Retrieve or create PlayerProgress
     progress = db.query(models.PlayerProgress).filter(
@@ -88,13 +256,15 @@ def get_game_stats(
         db.commit()
         db.refresh(progress)
 
+    user = db.query(models.User).filter(models.User.id == current_user.id).first()
+
     # Calculate net profit
     profit = progress.total_money_earned - progress.total_money_spent
 
     return PlayerStatsOut(
         player=PlayerStatsInfo(
-            username=current_user.username,
-            current_money=current_user.money,
+            username=user.username,
+            current_money=user.money,
             level=progress.current_level
         ),
         stats=PlayerStatsDetails(
@@ -105,3 +275,163 @@ def get_game_stats(
         )
     )
 
+
+@router.get("/game/stats/timeseries", tags=["Stats"], response_model=PlayerTimeseriesOut)
+def get_game_stats_timeseries(
+        bucket: StatsBucketEnum = StatsBucketEnum.DAY,
+        since: date | None = None,
+        until: date | None = None,
+        db: Session = Depends(get_db),
+        current_user: CurrentUser = Depends(get_current_user)
+):
+    """The player's economics per day, week or month (UTC), read from the daily rollup."""
+    until = until or datetime.now(timezone.utc).date()
+    since = since or until - timedelta(days=TIMESERIES_WINDOWS[bucket] - 1)
+    if since > until:
+        raise HTTPException(status_code=400, detail="since must be before until")
+    if (until - since).days >= MAX_TIMESERIES_DAYS:
+        raise HTTPException(status_code=400, detail="Time range too long")
+
+    # One row per active day: the cost doesn't depend on the number of logs
+    days = db.query(models.PlayerDailyStats).filter(
+        models.PlayerDailyStats.user_id == current_user.id,
+        models.PlayerDailyStats.day >= since,
+        models.PlayerDailyStats.day <= until
+    ).all()
+
+    # Every bucket of the range, empty ones included
+    buckets = {}
+    start = bucket_start(since, bucket)
+    while start <= until:
+        buckets[start] = {"money_earned": Decimal("0.00"), "money_spent": Decimal("0.00"),
+                          "orders_completed": 0, "orders_cancelled": 0}
+        start = next_bucket(start, bucket)
+
+    for day in days:
+        totals = buckets[bucket_start(day.day, bucket)]
+        totals["money_earned"] += day.money_earned
+        totals["money_spent"] += day.money_spent
+        totals["orders_completed"] += day.orders_completed
+        totals["orders_cancelled"] += day.orders_cancelled
+
+    return {
+        "bucket": bucket,
+        "since": since,
+        "until": until,
+        "series": [
+            {"period_start": start, "profit": totals["money_earned"] - totals["money_spent"], **totals}
+            for start, totals in buckets.items()
+        ]
+    }
+
+
+@router.get("/leaderboard", tags=["Stats"], response_model=LeaderboardOut)
+def get_leaderboard(
+        limit: int = Query(10, ge=1, le=100),
+        db: Session = Depends(get_db),
+        current_user: CurrentUser = Depends(get_current_user)
+):
+    """Top players by money earned and the current player's rank, served from memory."""
+    if not leaderboard.warmed:
+        leaderboard.load(db)
+    return leaderboard_response(limit, current_user.id)
+
+
+# ----------------------
+# ASYNC MODE
+# ----------------------
+@async_router.get("/admin/stats", tags=["Stats"])
+async def get_global_stats_async(
+        fresh: bool = Query(False, description="Recompute now instead of serving the last snapshot"),
+        db: AsyncSession = Depends(get_async_db),
+        current_admin: CurrentUser = Depends(get_current_admin_async)
+):
+    """Overall game statistics (admin only), from a snapshot refreshed in the background (see generated_at)."""
+    return await run_sync(db, get_global_stats, fresh=fresh, current_admin=current_admin)
+
+@async_router.post("/admin/levels/recompute", tags=["Stats"], response_model=LevelRecomputeOut)
+async def recompute_levels_async(
+        db: AsyncSession = Depends(get_async_db),
+        current_admin: CurrentUser = Depends(get_current_admin_async)
+):
+    """Re-levels every player with the current level curve (admin only). Players going up get a level_up log."""
+    return await run_sync(db, recompute_levels, current_admin=current_admin)
+
+@async_router.get("/admin/metrics", tags=["Stats"])
+async def get_metrics_async(
+        current_admin: CurrentUser = Depends(get_current_admin_async)
+):
+    """In-process counters of this worker: caches, password pool, log writer, leaderboard, menu catalog and order expiry (admin only)."""
+    return get_metrics(current_admin=current_admin)
+
+@async_router.get("/game/history", tags=["Stats"], response_model=GameHistoryOut)
+async def get_game_history_async(
+        limit: int = Query(50, ge=1, le=500),
+        cursor: str | None = None,
+        action_type: str | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        db: AsyncSession = Depends(get_async_db),
+        current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """Retrieves the player's action history, newest first. Pass `next_cursor` back as `cursor` for the next page."""
+    return await run_sync(
+        db, get_game_history,
+        limit=limit, cursor=cursor, action_type=action_type, since=since, until=until,
+        current_user=current_user
+    )
+
+@async_router.get("/game/history/stream", tags=["Stats"])
+async def stream_game_history_async(
+        action_type: str | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        db: AsyncSession = Depends(get_async_db),
+        current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """The player's whole history as NDJSON (one log per line), read through a server-side cursor."""
+    query = history_query(current_user.id, action_type, since, until)
+    bind = db.bind
+
+    async def lines():
+        async with AsyncSession(bind=bind) as session:
+            logs = await session.stream_scalars(query.execution_options(yield_per=HISTORY_STREAM_BATCH))
+            async for log in logs:
+                yield GameLogOut.model_validate(log).model_dump_json() + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@async_router.get("/game/stats", tags=["Stats"], response_model=PlayerStatsOut)
+async def get_game_stats_async(
+        request: Request,
+        response: Response,
+        db: AsyncSession = Depends(get_async_db),
+        current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """Retrieves the player's cumulative statistics."""
+    return await run_sync(db, get_game_stats, request, response, current_user=current_user)
+
+@async_router.get("/game/stats/timeseries", tags=["Stats"], response_model=PlayerTimeseriesOut)
+async def get_game_stats_timeseries_async(
+        bucket: StatsBucketEnum = StatsBucketEnum.DAY,
+        since: date | None = None,
+        until: date | None = None,
+        db: AsyncSession = Depends(get_async_db),
+        current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """The player's economics per day, week or month (UTC), read from the daily rollup."""
+    return await run_sync(
+        db, get_game_stats_timeseries,
+        bucket=bucket, since=since, until=until, current_user=current_user
+    )
+
+@async_router.get("/leaderboard", tags=["Stats"], response_model=LeaderboardOut)
+async def get_leaderboard_async(
+        limit: int = Query(10, ge=1, le=100),
+        db: AsyncSession = Depends(get_async_db),
+        current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """Top players by money earned and the current player's rank, served from memory."""
+    if not leaderboard.warmed:
+        await db.run_sync(leaderboard.load)
+    return leaderboard_response(limit, current_user.id)
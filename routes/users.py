@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from dependencies import get_current_admin
+from dependencies import CurrentUser, get_current_admin, invalidate_user
 from database import get_db
+from leaderboard import leaderboard
 import models
 
 from schemas import UserOut, UserUpdate
@@ -15,7 +16,7 @@ router = APIRouter()
 def read_user(
         user_id: int,
         db: Session = Depends(get_db),
-        admin: models.User = Depends(get_current_admin)
+        admin: CurrentUser = Depends(get_current_admin)
 ):
     """Retrieves a user by their ID (admin only)."""
 
@@ -29,7 +30,7 @@ def read_user(
 @router.get("/users", tags=["User"])
 def list_all_users(
         db: Session = Depends(get_db),
-        current_admin: models.User = Depends(get_current_admin)
+        current_admin: CurrentUser = Depends(get_current_admin)
 ):
     """Lists all users (admin only)."""
     users = db.query(models.User).all()
@@ -53,7 +54,7 @@ def update_user(
     user_id: int,
     user: UserUpdate,
     db: Session = Depends(get_db),
-    admin: models.User = Depends(get_current_admin)
+    admin: CurrentUser = Depends(get_current_admin)
 ):
     """Modifies an existing user (admin only)."""
     db_user = db.query(models.User).filter(models.User.id == user_id).first()
@@ -64,8 +65,12 @@ def update_user(
 
     if user.money is not None:
         db_user.money = user.money
+    db_user.state_version = models.User.state_version + 1
 
     db.commit()
+    invalidate_user(user_id)
+    if user.username is not None:
+        leaderboard.rename(user_id, user.username)
     db.refresh(db_user)
     return db_user
 
@@ -74,7 +79,7 @@ def update_user(
 def delete_user(
         user_id: int,
         db: Session = Depends(get_db),
-        admin: models.User = Depends(get_current_admin)
+        admin: CurrentUser = Depends(get_current_admin)
 ):
     """Delete a user (admin only)."""
     db_user = db.query(models.User).filter(models.User.id == user_id).first()
@@ -82,4 +87,6 @@ def delete_user(
         raise HTTPException(status_code=404, detail="User not found")
     db.delete(db_user)
     db.commit()
+    invalidate_user(user_id)
+    leaderboard.remove(user_id)
     return {"message": "User deleted"}
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, field_validator, Field, model_validator
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
 from enum import Enum
 
@@ -108,6 +108,10 @@ class RestockCreate(BaseModel):
     menu_item_id: int
     quantity: int = Field(..., gt=0)
 
+class RestockBulkCreate(BaseModel):
+    """Restocking of several products at once."""
+    items: list[RestockCreate] = Field(..., min_length=1, max_length=200)
+
 # ------------------------------------------------------------------------------------
 # INVENTORY
 # ------------------------------------------------------------------------------------
@@ -126,6 +130,11 @@ class InventoryItemPlayerOut(BaseModel):
 class InventoryOut(BaseModel):
     items: list[InventoryItemPlayerOut]
 
+class RestockBulkOut(BaseModel):
+    """Response of a bulk restock: the updated stock rows."""
+    total_cost: float
+    items: list[InventoryItemOut]
+
 # ------------------------------------------------------------------------------------
 # ORDERS
 # ------------------------------------------------------------------------------------
@@ -155,6 +164,21 @@ class OrderCreatedOut(BaseModel):
     order_id: int
     items: list[OrderedItemOut]
 
+class OrderBulkCreate(BaseModel):
+    """Several customer orders placed in one call"""
+    orders: list[OrderCreate] = Field(..., min_length=1, max_length=500)
+    allow_partial: bool = False
+
+class OrderBulkError(BaseModel):
+    index: int
+    detail: str
+
+class OrderBulkCreatedOut(BaseModel):
+    """Response when creating sales orders in bulk: one id per submitted order (None if rejected)"""
+    message: str
+    order_ids: list[int | None]
+    errors: list[OrderBulkError]
+
 class OrderStatusOut(BaseModel):
     """Response when order status changes"""
     message: str
@@ -170,13 +194,13 @@ class OrderSummaryOut(BaseModel):
     id: int
     status: OrderStatusEnum
     created_at: datetime
+    # Only with ?include=items
+    items: list[OrderedItemOut] | None = None
 
 class PaginatedOrdersOut(BaseModel):
-    """Paginated list of commands."""
-    page: int
+    """A page of the player's orders, newest first. Pass next_cursor back as cursor for the next one."""
     limit: int
-    total_items: int
-    total_pages: int
+    next_cursor: str | None = None
     items: list[OrderSummaryOut]
 
 class OrderAdminSummaryOut(BaseModel):
@@ -192,6 +216,8 @@ class PaginatedAdminOrdersOut(BaseModel):
     limit: int
     total_items: int
     total_pages: int
+    total_exact: bool = True
+    next_cursor: str | None = None
     items: list[OrderAdminSummaryOut]
 
 # ------------------------------------------------------------------------------------
@@ -214,6 +240,7 @@ class GameHistoryOut(BaseModel):
     player: PlayerHistoryInfo
     total_actions: int
     history: list[GameLogOut]
+    next_cursor: str | None = None  # None on the last page
 
 # ------------------------------------------------------------------------------------
 # PLAYER STATISTICS
@@ -235,4 +262,42 @@ class PlayerStatsDetails(BaseModel):
 class PlayerStatsOut(BaseModel):
     """Complete player statistics."""
     player: PlayerStatsInfo
-    stats: PlayerStatsDetails
\ No newline at end of file
+    stats: PlayerStatsDetails
+
+class StatsBucketEnum(str, Enum):
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+class TimeseriesPointOut(BaseModel):
+    """Player's economics over one bucket."""
+    period_start: date
+    money_earned: float
+    money_spent: float
+    profit: float
+    orders_completed: int
+    orders_cancelled: int
+
+class PlayerTimeseriesOut(BaseModel):
+    """Player's economics bucketed by day, week (starting on Monday) or month."""
+    bucket: StatsBucketEnum
+    since: date
+    until: date
+    series: list[TimeseriesPointOut]
+
+class LeaderboardEntryOut(BaseModel):
+    rank: int
+    username: str
+    total_money_earned: float
+    level: int
+
+class LeaderboardOut(BaseModel):
+    """Top players by money earned, and the current player's rank (None before their first action)."""
+    total_players: int
+    top: list[LeaderboardEntryOut]
+    me: LeaderboardEntryOut | None
+
+class LevelRecomputeOut(BaseModel):
+    """Result of a re-leveling of every player."""
+    updated: int
+    level_ups: int
@@ -28,6 +28,19 @@ TestingSessionLocal = sessionmaker(
 def disable_rate_limiter():
     app.state.limiter.enabled = False
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """User ids are reused from one test database to the next."""
+    from cache import user_cache, token_cache
+    from leaderboard import leaderboard
+    from global_stats import global_stats
+    from menu_catalog import menu_catalog
+    user_cache.clear()
+    token_cache.clear()
+    leaderboard.clear()
+    global_stats.clear()
+    menu_catalog.clear()
+
 @pytest.fixture(scope="function")
 def db():
     """
@@ -68,6 +81,40 @@ def client(db):
     app.dependency_overrides.clear()
 
 
+@pytest.fixture(scope="function")
+def async_client(db):
+    """
+    Create a test client serving the async gameplay routes on the test database.
+    """
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import NullPool
+    from database import get_async_db
+    from routes import auth, menu, restock, inventory, orders, stats
+
+    async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+    AsyncTestingSessionLocal = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with AsyncTestingSessionLocal() as session:
+            yield session
+
+    def override_get_db():
+        yield db
+
+    async_app = FastAPI()
+    async_app.state.limiter = app.state.limiter
+    async_app.include_router(auth.router)
+    for module in (menu, restock, inventory, orders, stats):
+        async_app.include_router(module.async_router)
+    async_app.dependency_overrides[get_db] = override_get_db
+    async_app.dependency_overrides[get_async_db] = override_get_async_db
+
+    with TestClient(async_app) as test_client:
+        yield test_client
+
+
 #--------------------------------------------------------------------
 
 #Token for USER:
@@ -0,0 +1,83 @@
+#-----------------------------------------------
+# Test the ASYNC mode (ASYNC_DB=true)
+#----------------------------------------------
+
+def signup_and_login(async_client, username):
+    async_client.post("/auth/signup", json={
+        "username": username,
+        "password": "Secret1",
+        "money": "1000"
+    })
+    response = async_client.post("/auth/login", json={
+        "username": username,
+        "password": "Secret1"
+    })
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+# Full game loop: menu -> restock -> order -> complete -> stats
+def test_async_game_loop_ok(async_client, db):
+    user_headers = signup_and_login(async_client, "player")
+    admin_headers = signup_and_login(async_client, "admin")
+    from models import User
+    db.query(User).filter(User.username == "admin").update({"is_admin": True})
+    db.commit()
+
+    response = async_client.post(
+        "/menu",
+        json={"name": "café", "purchase_price": "1.00", "selling_price": "1.50"},
+        headers=admin_headers
+    )
+    assert response.status_code == 201
+    menu_id = response.json()["id"]
+
+    response = async_client.post(
+        "/order/restock",
+        json={"menu_item_id": menu_id, "quantity": 5},
+        headers=user_headers
+    )
+    assert response.status_code == 200
+    assert response.json()["quantity"] == 5
+
+    response = async_client.post(
+        "/order/client",
+        json={"items": [{"menu_item_id": menu_id, "quantity": 2}]},
+        headers=user_headers
+    )
+    assert response.status_code == 200
+    order_id = response.json()["order_id"]
+
+    response = async_client.patch(f"/orders/{order_id}/complete", headers=user_headers)
+    assert response.status_code == 200
+
+    response = async_client.get("/inventory", headers=user_headers)
+    assert response.json()["items"][0]["quantity"] == 3
+
+    response = async_client.get("/game/stats", headers=user_headers)
+    assert response.status_code == 200
+    assert response.json()["player"]["current_money"] == 998.0
+
+    response = async_client.get("/admin/orders", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.json()["total_items"] == 1
+
+    response = async_client.get("/game/history?limit=1", headers=user_headers)
+    assert response.json()["total_actions"] == 4
+    assert response.json()["next_cursor"] is not None
+
+    response = async_client.get("/game/history/stream", headers=user_headers)
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == 4
+
+# The async handlers keep the same error contract
+def test_async_order_not_found_ko(async_client):
+    headers = signup_and_login(async_client, "player")
+    response = async_client.get("/orders/44", headers=headers)
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Order not found"
+
+def test_async_invalid_token(async_client):
+    response = async_client.get(
+        "/inventory",
+        headers={"Authorization": "Bearer ceciestunfauxtoken"}
+    )
+    assert response.status_code == 401
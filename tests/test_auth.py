@@ -104,4 +104,29 @@ def test_invalid_token(client):
         "/inventory",
         headers={"Authorization": "Bearer ceciestunfauxtoken"}
     )
-    assert response.status_code == 401
\ No newline at end of file
+    assert response.status_code == 401
+
+def busy_password_pool(monkeypatch):
+    from auth import PasswordPool
+    import auth
+    busy_pool = PasswordPool(workers=1, queue_limit=0)
+    busy_pool._slots.acquire()
+    monkeypatch.setattr(auth, "password_pool", busy_pool)
+    return busy_pool
+
+def test_login_password_pool_busy(client, monkeypatch):
+    client.post("/auth/signup", json={"username": "Nina", "password": "Secret1"})
+    busy_pool = busy_password_pool(monkeypatch)
+
+    response = client.post("/auth/login", json={"username": "Nina", "password": "Secret1"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert response.json()["detail"] == "Too many login attempts in progress, please retry"
+    assert busy_pool.stats()["rejected"] == 1
+
+def test_signup_password_pool_busy(client, monkeypatch):
+    busy_password_pool(monkeypatch)
+
+    response = client.post("/auth/signup", json={"username": "Nina", "password": "Secret1"})
+    assert response.status_code == 503
+    assert response.json()["detail"] == "Too many signups in progress, please retry"
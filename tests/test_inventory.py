@@ -19,6 +19,22 @@ def test_get_inventory_no_token(client):
     )
     assert response.status_code == 403
 
+# Conditional GET: 304 until a restock changes the inventory
+def test_get_inventory_etag(client, user_token, menu_id, inventory_item_id):
+    headers = {"Authorization": f"Bearer {user_token}"}
+    first = client.get("/inventory", headers=headers)
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "private, no-cache"
+
+    cached = client.get("/inventory", headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    client.post("/order/restock", json={"menu_item_id": menu_id, "quantity": 1}, headers=headers)
+    changed = client.get("/inventory", headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
 # Test GET /inventory/{item_id}
 #---------------------------------------------
 # The user can view an item in the inventory.
@@ -86,3 +86,54 @@ def test_delete_menu_non_existing_item(client, admin_token):
     assert response.status_code == 404
     assert response.json()["detail"] == "Menu item not found"
 
+
+
+# Menu catalog
+#----------------------------------
+# A menu write replaces the snapshot; reads are then served without querying menu_items
+def test_menu_catalog_follows_writes(client, db, admin_token, user_token, menu_id):
+    from sqlalchemy import event
+    from menu_catalog import menu_catalog
+    headers = {"Authorization": f"Bearer {user_token}"}
+    version = menu_catalog.snapshot(db).version
+
+    client.put(f"/menu/{menu_id}", json={"name": "espresso"}, headers={"Authorization": f"Bearer {admin_token}"})
+    assert menu_catalog.snapshot(db).version == version + 1
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        response = client.get(f"/menu/{menu_id}", headers=headers)
+        client.post("/order/client", json={"items": [{"menu_item_id": menu_id, "quantity": 1}]}, headers=headers)
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+    assert response.json()["name"] == "espresso"
+    assert not [statement for statement in statements if "FROM menu_items" in statement]
+    assert menu_catalog.stats()["hits"] >= 2
+
+# Unknown ids reload the snapshot once, then are known missing until the next reload
+def test_menu_catalog_unknown_ids(client, db, user_token, menu_id):
+    from menu_catalog import menu_catalog
+    headers = {"Authorization": f"Bearer {user_token}"}
+    menu_catalog.snapshot(db)
+    reloads = menu_catalog.stats()["reloads"]
+
+    for unknown_id in (404, 405, 406):
+        assert client.get(f"/menu/{unknown_id}", headers=headers).status_code == 404
+    assert client.get(f"/menu/{menu_id}", headers=headers).status_code == 200
+    assert menu_catalog.stats()["reloads"] == reloads + 1
+    assert menu_catalog.stats()["unknown_ids"] == 3
+
+# Conditional GET on the menu: same ETag on both routes, changed by a menu write
+def test_menu_etag(client, admin_token, user_token, menu_id):
+    headers = {"Authorization": f"Bearer {user_token}"}
+    etag = client.get("/menu", headers=headers).headers["etag"]
+    assert client.get(f"/menu/{menu_id}", headers={**headers, "If-None-Match": etag}).status_code == 304
+    assert client.get("/menu", headers={**headers, "If-None-Match": etag}).status_code == 304
+
+    client.put(f"/menu/{menu_id}", json={"selling_price": 2.5}, headers={"Authorization": f"Bearer {admin_token}"})
+    response = client.get("/menu", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["items"][0]["selling_price"] == 2.5
@@ -1,3 +1,4 @@
+from decimal import Decimal
 #-----------------------------------------------
 # Test on ORDERS
 #----------------------------------------------
@@ -175,3 +176,359 @@ def test_admin_get_all_orders(client, admin_token, order_id, second_order_id):
     )
 
     assert response.status_code == 200
+
+# Keyset pages: no gap nor duplicate; the count is exact when asked for (or on SQLite)
+def test_admin_get_all_orders_pages(client, admin_token, user_token, menu_id):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    for _ in range(5):
+        client.post("/order/client", json={"items": [{"menu_item_id": menu_id, "quantity": 1}]},
+                    headers={"Authorization": f"Bearer {user_token}"})
+
+    first = client.get("/admin/orders?limit=2&exact_count=true", headers=headers).json()
+    assert first["total_items"] == 5
+    assert first["total_exact"] is True
+
+    ids = [order["id"] for order in first["items"]]
+    cursor = first["next_cursor"]
+    while cursor:
+        page = client.get(f"/admin/orders?limit=2&cursor={cursor}", headers=headers).json()
+        ids += [order["id"] for order in page["items"]]
+        cursor = page["next_cursor"]
+    assert ids == [5, 4, 3, 2, 1]
+
+    # Compatibility mode: page numbers
+    legacy = client.get("/admin/orders?limit=2&page=2", headers=headers).json()
+    assert [order["id"] for order in legacy["items"]] == [3, 2]
+
+# GET /orders: the player's own orders, by pages, with their lines on demand
+def test_list_my_orders(client, user_token, second_user_token, menu_id):
+    headers = {"Authorization": f"Bearer {user_token}"}
+    for quantity in range(1, 4):
+        client.post("/order/client", json={"items": [{"menu_item_id": menu_id, "quantity": quantity}]}, headers=headers)
+    client.post("/order/client", json={"items": [{"menu_item_id": menu_id, "quantity": 1}]},
+                headers={"Authorization": f"Bearer {second_user_token}"})
+
+    first = client.get("/orders?limit=2", headers=headers).json()
+    assert [order["id"] for order in first["items"]] == [3, 2]
+    assert first["items"][0]["items"] is None
+
+    last = client.get(f"/orders?limit=2&include=items&cursor={first['next_cursor']}", headers=headers).json()
+    assert last["next_cursor"] is None
+    assert last["items"][0]["items"] == [{"menu_item_id": menu_id, "menu_item_name": "café", "quantity": 1}]
+
+    assert client.get("/orders?status=completed", headers=headers).json()["items"] == []
+    assert client.get("/orders?include=everything", headers=headers).status_code == 422
+
+# Orders pending past the TTL are cancelled and logged, the recent ones are kept
+def test_expire_pending_orders(client, db, user_token, menu_id, order_id, second_order_id):
+    from datetime import datetime, timedelta, timezone
+    from sqlalchemy import update
+    import models
+    from jobs.order_expiry import expire_batch
+    headers = {"Authorization": f"Bearer {user_token}"}
+
+    db.execute(
+        update(models.Order).where(models.Order.id == order_id)
+        .values(created_at=datetime.now(timezone.utc) - timedelta(hours=2))
+    )
+    db.commit()
+
+    assert expire_batch(db, datetime.now(timezone.utc) - timedelta(hours=1), batch_size=10) == 1
+    assert client.get(f"/orders/{order_id}", headers=headers).json()["status"] == "cancelled"
+    assert db.get(models.Order, second_order_id).status == models.OrderStatus.PENDING
+
+    history = client.get("/game/history?action_type=order_cancelled", headers=headers).json()["history"]
+    assert [log["message"] for log in history] == [f"Commande expirée : {order_id}"]
+
+# The player can't cancel an order the expiry already cancelled: it is counted once
+def test_cancel_expired_order(client, db, user_token, order_id):
+    from datetime import datetime, timedelta, timezone
+    from jobs.order_expiry import expire_batch
+    headers = {"Authorization": f"Bearer {user_token}"}
+
+    assert expire_batch(db, datetime.now(timezone.utc) + timedelta(minutes=1), batch_size=10) == 1
+    response = client.patch(f"/orders/{order_id}/cancel", headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Order is not pending"
+
+    series = client.get("/game/stats/timeseries", headers=headers).json()["series"]
+    assert sum(point["orders_cancelled"] for point in series) == 1
+
+# Old finished orders leave the hot tables and stay readable by id
+def test_archive_orders(client, db, user_token, order_id, second_order_id):
+    from datetime import datetime, timedelta, timezone
+    from sqlalchemy import update
+    import models
+    from jobs.order_archive import archive_chunk
+    headers = {"Authorization": f"Bearer {user_token}"}
+    client.patch(f"/orders/{order_id}/complete", headers=headers)
+    before = client.get(f"/orders/{order_id}", headers=headers).json()
+
+    old = datetime.now(timezone.utc) - timedelta(days=100)
+    db.execute(update(models.Order).values(created_at=old))
+    db.commit()
+    with db.get_bind().begin() as conn:
+        # The second order is still pending: kept
+        assert archive_chunk(conn, datetime.now(timezone.utc) - timedelta(days=90), chunk_size=10) == 1
+    db.expire_all()
+
+    assert db.get(models.Order, order_id) is None
+    assert db.query(models.OrderItem).filter(models.OrderItem.order_id == order_id).count() == 0
+    assert db.get(models.Order, second_order_id) is not None
+    assert client.get(f"/orders/{order_id}", headers=headers).json() == before
+
+# Archived orders leave the default listings, and are listed with archived=true
+def test_list_archived_orders(client, db, user_token, admin_token, menu_id, order_id):
+    from datetime import datetime, timedelta, timezone
+    from sqlalchemy import update
+    import models
+    from jobs.order_archive import archive_chunk
+    headers = {"Authorization": f"Bearer {user_token}"}
+    second_order_id = client.post(
+        "/order/client", json={"items": [{"menu_item_id": menu_id, "quantity": 1}]}, headers=headers
+    ).json()["order_id"]
+    client.patch(f"/orders/{order_id}/complete", headers=headers)
+    client.patch(f"/orders/{second_order_id}/cancel", headers=headers)
+
+    for days, archived_id in ((101, order_id), (100, second_order_id)):
+        db.execute(update(models.Order).where(models.Order.id == archived_id)
+                   .values(created_at=datetime.now(timezone.utc) - timedelta(days=days)))
+    db.commit()
+    with db.get_bind().begin() as conn:
+        assert archive_chunk(conn, datetime.now(timezone.utc) - timedelta(days=90), chunk_size=10) == 2
+
+    assert client.get("/orders", headers=headers).json()["items"] == []
+    first = client.get("/orders?archived=true&limit=1", headers=headers).json()
+    assert [order["id"] for order in first["items"]] == [second_order_id]
+    last = client.get(f"/orders?archived=true&include=items&cursor={first['next_cursor']}", headers=headers).json()
+    assert [(order["id"], order["status"]) for order in last["items"]] == [(order_id, "completed")]
+    assert last["items"][0]["items"][0]["menu_item_name"] == "café"
+
+    admin = client.get("/admin/orders?archived=true&limit=1", headers={"Authorization": f"Bearer {admin_token}"}).json()
+    assert admin["total_items"] == 2
+    assert [order["id"] for order in admin["items"]] == [second_order_id]
+
+# The order is paid at the price it was placed at, whatever the menu says at completion
+def test_patch_order_complete_uses_captured_price(client, db, admin_token, user_token, menu_id, order_id):
+    import models
+    headers = {"Authorization": f"Bearer {user_token}"}
+    line = db.query(models.OrderItem).filter(models.OrderItem.order_id == order_id).one()
+    assert (line.unit_price, line.menu_item_name) == (Decimal("1.20"), "café")
+
+    client.put(f"/menu/{menu_id}", json={"name": "latte", "selling_price": 9.0},
+               headers={"Authorization": f"Bearer {admin_token}"})
+    money = client.get("/game/history", headers=headers).json()["player"]["money"]
+    client.patch(f"/orders/{order_id}/complete", headers=headers)
+
+    player = client.get("/game/history", headers=headers).json()["player"]
+    assert Decimal(str(player["money"])) - Decimal(str(money)) == line.unit_price * line.quantity
+    assert client.get(f"/orders/{order_id}", headers=headers).json()["items"][0]["menu_item_name"] == "café"
+
+# Completing an order removes the stock and credits the player
+def test_patch_order_complete_updates_stock_and_money(client, user_token, menu_id):
+    headers = {"Authorization": f"Bearer {user_token}"}
+    client.post("/order/restock", json={"menu_item_id": menu_id, "quantity": 5}, headers=headers)
+    order = client.post(
+        "/order/client",
+        json={"items": [
+            {"menu_item_id": menu_id, "quantity": 1},
+            {"menu_item_id": menu_id, "quantity": 2}
+        ]},
+        headers=headers
+    )
+
+    response = client.patch(f"/orders/{order.json()['order_id']}/complete", headers=headers)
+    assert response.status_code == 200
+
+    inventory = client.get("/inventory", headers=headers).json()
+    assert inventory["items"][0]["quantity"] == 2
+    stats = client.get("/game/stats", headers=headers).json()
+    # 1000 - 5 x 1.00 + 3 x 1.20
+    assert stats["player"]["current_money"] == 998.6
+    assert stats["stats"]["total_orders"] == 1
+
+# One short line -> 400 and no stock is removed
+def test_patch_order_complete_partial_stock_ko(client, user_token, menu_ids):
+    headers = {"Authorization": f"Bearer {user_token}"}
+    client.post("/order/restock", json={"menu_item_id": menu_ids[0], "quantity": 3}, headers=headers)
+    order = client.post(
+        "/order/client",
+        json={"items": [
+            {"menu_item_id": menu_ids[0], "quantity": 1},
+            {"menu_item_id": menu_ids[1], "quantity": 1}
+        ]},
+        headers=headers
+    )
+
+    response = client.patch(f"/orders/{order.json()['order_id']}/complete", headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Not enough stock"
+
+    inventory = client.get("/inventory", headers=headers).json()
+    assert inventory["items"][0]["quantity"] == 3
+
+# An order with several products is created with all its lines
+def test_post_order_several_items_ok(client, user_token, menu_ids):
+    headers = {"Authorization": f"Bearer {user_token}"}
+    response = client.post(
+        "/order/client",
+        json={"items": [{"menu_item_id": menu_id, "quantity": 2} for menu_id in menu_ids]},
+        headers=headers
+    )
+    assert response.status_code == 200
+    assert [item["menu_item_name"] for item in response.json()["items"]] == ["café", "latte", "espresso"]
+
+    order = client.get(f"/orders/{response.json()['order_id']}", headers=headers)
+    assert len(order.json()["items"]) == 3
+
+# One unknown product among valid ones -> 404 and no order
+def test_post_order_one_unexisting_item_ko(client, user_token, menu_id):
+    response = client.post(
+        "/order/client",
+        json={"items": [
+            {"menu_item_id": menu_id, "quantity": 1},
+            {"menu_item_id": 44, "quantity": 1}
+        ]},
+        headers={"Authorization": f"Bearer {user_token}"}
+    )
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Item not found"
+
+# Test POST /order/client/bulk
+#---------------------------------------------
+# Several orders are created, their ids returned in order
+def test_post_orders_bulk_ok(client, user_token, menu_ids):
+    headers = {"Authorization": f"Bearer {user_token}"}
+    response = client.post(
+        "/order/client/bulk",
+        json={"orders": [
+            {"items": [{"menu_item_id": menu_ids[0], "quantity": 1}]},
+            {"items": [{"menu_item_id": menu_ids[1], "quantity": 2},
+                       {"menu_item_id": menu_ids[2], "quantity": 1}]}
+        ]},
+        headers=headers
+    )
+    assert response.status_code == 200
+    order_ids = response.json()["order_ids"]
+    assert len(order_ids) == 2
+    assert order_ids[0] < order_ids[1]
+
+    order = client.get(f"/orders/{order_ids[1]}", headers=headers)
+    assert [item["menu_item_name"] for item in order.json()["items"]] == ["latte", "espresso"]
+
+# An unknown product rejects the whole batch
+def test_post_orders_bulk_unexisting_item_ko(client, user_token, menu_id):
+    response = client.post(
+        "/order/client/bulk",
+        json={"orders": [
+            {"items": [{"menu_item_id": menu_id, "quantity": 1}]},
+            {"items": [{"menu_item_id": 44, "quantity": 1}]}
+        ]},
+        headers={"Authorization": f"Bearer {user_token}"}
+    )
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Item not found"
+
+# allow_partial: the valid orders are created, the others reported
+def test_post_orders_bulk_partial_ok(client, user_token, menu_id):
+    response = client.post(
+        "/order/client/bulk",
+        json={
+            "orders": [
+                {"items": [{"menu_item_id": 44, "quantity": 1}]},
+                {"items": [{"menu_item_id": menu_id, "quantity": 1}]}
+            ],
+            "allow_partial": True
+        },
+        headers={"Authorization": f"Bearer {user_token}"}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["order_ids"][0] is None
+    assert data["order_ids"][1] is not None
+    assert data["errors"] == [{"index": 0, "detail": "Item not found"}]
+
+# Test of the write-behind game logs
+#---------------------------------------------
+# order_created logs wait in the queue until the writer flushes them
+def test_order_logs_written_behind(client, db, user_token, menu_id, monkeypatch):
+    import gamelog_writer
+    import models
+    writer = gamelog_writer.GameLogWriter(
+        enabled=True, queue_size=100, batch_size=50, interval=60.0, engine=db.get_bind()
+    )
+    monkeypatch.setattr(gamelog_writer, "writer", writer)
+    client.portal.call(writer.start)
+
+    response = client.post(
+        "/order/client",
+        json={"items": [{"menu_item_id": menu_id, "quantity": 2}]},
+        headers={"Authorization": f"Bearer {user_token}"}
+    )
+    assert response.status_code == 200
+    created_logs = db.query(models.GameLog).filter(models.GameLog.action_type == "order_created")
+    assert created_logs.count() == 0
+    assert writer.stats()["queued"] == 1
+
+    client.portal.call(writer.stop)
+    assert created_logs.count() == 1
+    assert writer.stats()["written"] == 1
+
+# Writer enabled but not started (CLI commands): the logs stay in the transaction
+def test_order_logs_not_deferred_without_writer_task(client, db, user_token, menu_id, monkeypatch):
+    import gamelog_writer
+    import models
+    writer = gamelog_writer.GameLogWriter(
+        enabled=True, queue_size=100, batch_size=50, interval=60.0, engine=db.get_bind()
+    )
+    monkeypatch.setattr(gamelog_writer, "writer", writer)
+
+    client.post(
+        "/order/client",
+        json={"items": [{"menu_item_id": menu_id, "quantity": 2}]},
+        headers={"Authorization": f"Bearer {user_token}"}
+    )
+    assert db.query(models.GameLog).filter(models.GameLog.action_type == "order_created").count() == 1
+    assert writer.stats()["queued"] == 0
+
+# Queue full -> the oldest logs are dropped, the request doesn't write them
+def test_order_logs_queue_full_drops_oldest(client, db, user_token, menu_id, monkeypatch):
+    import gamelog_writer
+    import models
+    writer = gamelog_writer.GameLogWriter(
+        enabled=True, queue_size=1, batch_size=50, interval=60.0, engine=db.get_bind()
+    )
+    monkeypatch.setattr(gamelog_writer, "writer", writer)
+    client.portal.call(writer.start)
+
+    for quantity in (1, 2):
+        client.post(
+            "/order/client",
+            json={"items": [{"menu_item_id": menu_id, "quantity": quantity}]},
+            headers={"Authorization": f"Bearer {user_token}"}
+        )
+    created_logs = db.query(models.GameLog).filter(models.GameLog.action_type == "order_created")
+    assert created_logs.count() == 0
+    assert writer.stats()["queued"] == 1
+    assert writer.stats()["dropped"] == 1
+
+    client.portal.call(writer.stop)
+    assert [log.message for log in created_logs] == ["New order : 2x café"]
+
+# A failed batch is requeued within the bound of the queue
+def test_order_logs_requeue_bounded(monkeypatch):
+    import gamelog_writer
+    writer = gamelog_writer.GameLogWriter(enabled=True, queue_size=2, batch_size=2, interval=1.0)
+    row = {"user_id": 1, "action_type": "order_created", "message": "New order"}
+    writer.put([row, row])
+
+    def write(rows):
+        # A request commits while the batch is being written
+        writer.put([row])
+        raise RuntimeError("database down")
+    monkeypatch.setattr(writer, "write", write)
+
+    writer.flush()
+    assert writer.stats()["queued"] == 2
+    assert writer.stats()["dropped"] == 1
+    assert writer.stats()["failures"] == 1
@@ -0,0 +1,25 @@
+#-----------------------------------------------
+# Test on the gamelog PARTITIONS maintenance
+#----------------------------------------------
+from datetime import date
+
+from jobs.partitions import add_months, partition_month, partition_name
+
+
+# Month arithmetic across the year boundaries
+def test_add_months():
+    assert add_months(date(2026, 11, 1), 3) == date(2027, 2, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert add_months(date(2026, 10, 1), -12) == date(2025, 10, 1)
+
+# A partition name gives back its month, other tables are ignored
+def test_partition_name_round_trip():
+    assert partition_name(date(2026, 3, 1)) == "gamelog_y2026m03"
+    assert partition_month("gamelog_y2026m03") == date(2026, 3, 1)
+    assert partition_month("gamelog_default") is None
+
+# SQLite keeps a plain table: nothing to do
+def test_partitions_command_sqlite_noop(capsys):
+    from manage import main
+    assert main(["partitions", "--dry-run"]) == 0
+    assert "nothing to do" in capsys.readouterr().out
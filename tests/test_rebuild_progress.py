@@ -0,0 +1,68 @@
+#-----------------------------------------------
+# Test on the PlayerProgress REBUILD job
+#----------------------------------------------
+import models
+from jobs.rebuild_progress import rebuild
+
+
+def play(client, user_token, order_id):
+    headers = {"Authorization": f"Bearer {user_token}"}
+    client.patch(f"/orders/{order_id}/complete", headers=headers)
+    return client.get("/game/stats", headers=headers).json()["stats"]
+
+def player_progress(db):
+    return (
+        db.query(models.PlayerProgress)
+        .join(models.User, models.User.id == models.PlayerProgress.user_id)
+        .filter(models.User.username == "user")
+    )
+
+# Drifted counters are recomputed from the logs
+def test_rebuild_progress_fixes_drift(client, db, user_token, order_id):
+    expected = play(client, user_token, order_id)
+    player_progress(db).one().total_money_earned = 999
+    player_progress(db).one().total_orders = 42
+    db.commit()
+
+    totals = rebuild(chunk_size=2, workers=1, bind=db.get_bind())
+    assert totals["changed"] == 1
+
+    db.expire_all()
+    progress = player_progress(db).one()
+    assert float(progress.total_money_earned) == expected["total_money_earned"]
+    assert float(progress.total_money_spent) == expected["total_money_spent"]
+    assert progress.total_orders == expected["total_orders"] == 1
+
+    # Nothing left to fix
+    assert rebuild(chunk_size=2, workers=1, bind=db.get_bind())["changed"] == 0
+
+# Dry run: the differences are reported, not written
+def test_rebuild_progress_dry_run(client, db, user_token, order_id):
+    play(client, user_token, order_id)
+    player_progress(db).one().total_orders = 42
+    db.commit()
+
+    totals = rebuild(workers=1, dry_run=True, bind=db.get_bind())
+    assert totals["changed"] == 1
+    assert totals["diffs"][0][1].orders == 42
+
+    db.expire_all()
+    assert player_progress(db).one().total_orders == 42
+
+# The logs dropped by the partition retention still count through their carry-over
+def test_rebuild_progress_keeps_carried_over_logs(client, db, user_token, order_id):
+    play(client, user_token, order_id)
+    progress = player_progress(db).one()
+    db.add(models.ProgressCarryover(
+        user_id=progress.user_id,
+        money_earned=progress.total_money_earned,
+        money_spent=progress.total_money_spent,
+        orders=progress.total_orders,
+        actions=progress.total_actions
+    ))
+    db.query(models.GameLog).filter(models.GameLog.user_id == progress.user_id).delete()
+    db.commit()
+
+    assert rebuild(workers=1, bind=db.get_bind())["changed"] == 0
+    db.expire_all()
+    assert player_progress(db).one().total_orders == 1
@@ -0,0 +1,93 @@
+#-----------------------------------------------
+# Test on RESTOCK
+#----------------------------------------------
+
+# Test POST /order/restock
+#---------------------------------------------
+# Restocking twice the same product adds to the same stock row
+def test_post_restock_twice_same_row(client, user_token, menu_id):
+    headers = {"Authorization": f"Bearer {user_token}"}
+    first = client.post("/order/restock", json={"menu_item_id": menu_id, "quantity": 2}, headers=headers)
+    second = client.post("/order/restock", json={"menu_item_id": menu_id, "quantity": 3}, headers=headers)
+
+    assert second.status_code == 200
+    assert second.json()["id"] == first.json()["id"]
+    assert second.json()["quantity"] == 5
+
+# Not enough money -> 400
+def test_post_restock_not_enough_money_ko(client, user_token, menu_id):
+    response = client.post(
+        "/order/restock",
+        json={"menu_item_id": menu_id, "quantity": 5000},
+        headers={"Authorization": f"Bearer {user_token}"}
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Not enough money!"
+
+# Test POST /order/restock/bulk
+#---------------------------------------------
+# Several products restocked at once, the cost taken once
+def test_post_restock_bulk_ok(client, user_token, menu_ids):
+    headers = {"Authorization": f"Bearer {user_token}"}
+    client.post("/order/restock", json={"menu_item_id": menu_ids[0], "quantity": 1}, headers=headers)
+
+    response = client.post(
+        "/order/restock/bulk",
+        json={"items": [
+            {"menu_item_id": menu_ids[0], "quantity": 2},
+            {"menu_item_id": menu_ids[1], "quantity": 4},
+            {"menu_item_id": menu_ids[0], "quantity": 1}
+        ]},
+        headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json()["total_cost"] == 7.0
+    quantities = {item["menu_item_id"]: item["quantity"] for item in response.json()["items"]}
+    assert quantities == {menu_ids[0]: 4, menu_ids[1]: 4}
+
+    stats = client.get("/game/stats", headers=headers).json()
+    assert stats["player"]["current_money"] == 992.0
+    assert stats["stats"]["total_money_spent"] == 8.0
+
+# The money check covers the whole batch -> 400 and nothing is bought
+def test_post_restock_bulk_not_enough_money_ko(client, user_token, menu_ids):
+    headers = {"Authorization": f"Bearer {user_token}"}
+    response = client.post(
+        "/order/restock/bulk",
+        json={"items": [
+            {"menu_item_id": menu_ids[0], "quantity": 600},
+            {"menu_item_id": menu_ids[1], "quantity": 600}
+        ]},
+        headers=headers
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Not enough money!"
+    assert client.get("/inventory", headers=headers).json()["items"] == []
+
+# Unknown product -> 404
+def test_post_restock_bulk_unexisting_item_ko(client, user_token, menu_id):
+    response = client.post(
+        "/order/restock/bulk",
+        json={"items": [
+            {"menu_item_id": menu_id, "quantity": 1},
+            {"menu_item_id": 44, "quantity": 1}
+        ]},
+        headers={"Authorization": f"Bearer {user_token}"}
+    )
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Product not found"
+
+# Test of the game journal
+#---------------------------------------------
+# Logs journaled in a rolled back transaction are never written
+def test_journal_dropped_on_rollback(client, db, user_token, user_id):
+    from game_utils import log_action
+    import models
+
+    log_action(db=db, user_id=user_id, action_type="restock", message="rolled back", amount=-10)
+    db.rollback()
+    db.commit()
+
+    assert db.query(models.GameLog).filter(models.GameLog.message == "rolled back").count() == 0
+    progress = db.query(models.PlayerProgress).filter(models.PlayerProgress.user_id == user_id).first()
+    assert progress is None or progress.total_money_spent == 0
@@ -10,6 +10,21 @@ def test_get_admin_game_stats(client, admin_token, order_id):
 
     assert response.status_code == 200
 
+# Served from the snapshot until ?fresh=true
+def test_get_admin_stats_snapshot(client, admin_token, menu_id):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    first = client.get("/admin/stats?fresh=true", headers=headers).json()
+    assert first["game"]["total_menu_items"] == 1
+    assert first["users"] == {"total": 1, "admins": 1, "players": 0}
+
+    client.post("/auth/signup", json={"username": "barista", "password": "Secret1"})
+    cached = client.get("/admin/stats", headers=headers).json()
+    assert cached == first
+
+    fresh = client.get("/admin/stats?fresh=true", headers=headers).json()
+    assert fresh["users"]["players"] == 1
+    assert fresh["generated_at"] > first["generated_at"]
+
 #A user can view their gaming history
 def test_get_game_history(client, user_token, order_id):
     response = client.get(
@@ -19,6 +34,58 @@ def test_get_game_history(client, user_token, order_id):
 
     assert response.status_code == 200
 
+# Pages follow each other with the cursor, without gap nor duplicate
+def test_get_game_history_pages(client, user_token, menu_id):
+    headers = {"Authorization": f"Bearer {user_token}"}
+    for _ in range(5):
+        client.post("/order/restock", json={"menu_item_id": menu_id, "quantity": 1}, headers=headers)
+
+    first = client.get("/game/history?limit=2", headers=headers).json()
+    assert first["total_actions"] == 5
+    assert len(first["history"]) == 2
+
+    ids = [log["id"] for log in first["history"]]
+    cursor = first["next_cursor"]
+    while cursor:
+        page = client.get(f"/game/history?limit=2&cursor={cursor}", headers=headers).json()
+        ids += [log["id"] for log in page["history"]]
+        cursor = page["next_cursor"]
+
+    assert len(ids) == 5
+    assert ids == sorted(ids, reverse=True)
+
+# Filter on the action type
+def test_get_game_history_action_type(client, user_token, order_id):
+    response = client.get(
+        "/game/history?action_type=order_created",
+        headers={"Authorization": f"Bearer {user_token}"}
+    )
+    assert response.status_code == 200
+    assert [log["action_type"] for log in response.json()["history"]] == ["order_created"]
+
+# Tampered cursor -> 400
+def test_get_game_history_invalid_cursor_ko(client, user_token):
+    response = client.get(
+        "/game/history?cursor=not-a-cursor",
+        headers={"Authorization": f"Bearer {user_token}"}
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+# The whole history as NDJSON
+def test_stream_game_history(client, user_token, menu_id):
+    import json
+    headers = {"Authorization": f"Bearer {user_token}"}
+    for _ in range(3):
+        client.post("/order/restock", json={"menu_item_id": menu_id, "quantity": 1}, headers=headers)
+
+    response = client.get("/game/history/stream?action_type=restock", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    logs = [json.loads(line) for line in response.text.splitlines()]
+    assert len(logs) == 3
+    assert all(log["action_type"] == "restock" for log in logs)
+
 #A user can view their stats
 def test_get_game_stats(client, user_token, order_id):
     response = client.get(
@@ -28,9 +95,162 @@ def test_get_game_stats(client, user_token, order_id):
 
     assert response.status_code == 200
 
+# Conditional GET: completing an order changes the stats ETag
+def test_get_game_stats_etag(client, user_token, order_id):
+    headers = {"Authorization": f"Bearer {user_token}"}
+    etag = client.get("/game/stats", headers=headers).headers["etag"]
+    assert client.get("/game/stats", headers={**headers, "If-None-Match": etag}).status_code == 304
+
+    client.patch(f"/orders/{order_id}/complete", headers=headers)
+    response = client.get("/game/stats", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["stats"]["total_orders"] == 1
+
 def test_get_game_stats_empty(client, user_token):
     response = client.get(
         "/game/stats",
         headers={"Authorization": f"Bearer {user_token}"}
     )
-    assert response.status_code == 200
\ No newline at end of file
+    assert response.status_code == 200
+# Test of the LEVEL curve
+#---------------------------------------------
+# Bisection on both thresholds: the lowest of the two levels wins
+def test_level_curve():
+    from decimal import Decimal
+    from game_utils import compute_level
+    assert compute_level(Decimal("0"), 0) == 1
+    assert compute_level(Decimal("100"), 10) == 2
+    assert compute_level(Decimal("99.99"), 500) == 1
+    assert compute_level(Decimal("600"), 60) == 3
+    assert compute_level(Decimal("50000"), 1000) == 5
+
+# Players whose level rises get it with a level_up log, once
+def test_recompute_levels(client, db, admin_token, user_token, order_id):
+    import models
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    client.patch(f"/orders/{order_id}/complete", headers={"Authorization": f"Bearer {user_token}"})
+    progress = db.query(models.PlayerProgress).one()
+    progress.total_money_earned = 600
+    progress.total_orders = 60
+    db.commit()
+
+    response = client.post("/admin/levels/recompute", headers=headers)
+    assert response.status_code == 200
+    assert response.json() == {"updated": 1, "level_ups": 1}
+
+    stats = client.get("/game/stats", headers={"Authorization": f"Bearer {user_token}"}).json()
+    assert stats["player"]["level"] == 3
+    level_ups = db.query(models.GameLog).filter(models.GameLog.action_type == "level_up").all()
+    assert [log.message for log in level_ups] == ["Congrats! Level 3 achieved !"]
+
+    # Already up to date
+    assert client.post("/admin/levels/recompute", headers=headers).json() == {"updated": 0, "level_ups": 0}
+
+# Players can't re-level the game
+def test_recompute_levels_player_ko(client, user_token):
+    response = client.post("/admin/levels/recompute", headers={"Authorization": f"Bearer {user_token}"})
+    assert response.status_code == 403
+
+# Test GET /game/stats/timeseries
+#---------------------------------------------
+# Today's bucket holds the restock, the completed and the cancelled order
+def test_get_game_stats_timeseries(client, user_token, menu_id, order_id):
+    headers = {"Authorization": f"Bearer {user_token}"}
+    client.patch(f"/orders/{order_id}/complete", headers=headers)
+    second = client.post(
+        "/order/client",
+        json={"items": [{"menu_item_id": menu_id, "quantity": 1}]},
+        headers=headers
+    ).json()["order_id"]
+    client.patch(f"/orders/{second}/cancel", headers=headers)
+
+    for bucket in ("day", "week", "month"):
+        response = client.get(f"/game/stats/timeseries?bucket={bucket}", headers=headers)
+        assert response.status_code == 200
+        series = response.json()["series"]
+        last = series[-1]
+        assert last["orders_completed"] == 1
+        assert last["orders_cancelled"] == 1
+        assert last["money_spent"] > 0
+        assert last["profit"] == round(last["money_earned"] - last["money_spent"], 2)
+        assert sum(point["orders_completed"] for point in series) == 1
+
+    assert len(client.get("/game/stats/timeseries", headers=headers).json()["series"]) == 30
+
+# Reversed range -> 400
+def test_get_game_stats_timeseries_range_ko(client, user_token):
+    response = client.get(
+        "/game/stats/timeseries?since=2026-02-01&until=2026-01-01",
+        headers={"Authorization": f"Bearer {user_token}"}
+    )
+    assert response.status_code == 400
+
+# The backfill rebuilds the same rows from the logs
+def test_backfill_daily_stats(client, db, user_token, order_id):
+    import models
+    from jobs.daily_stats import backfill
+    headers = {"Authorization": f"Bearer {user_token}"}
+    client.patch(f"/orders/{order_id}/complete", headers=headers)
+    expected = client.get("/game/stats/timeseries", headers=headers).json()
+
+    db.query(models.PlayerDailyStats).delete()
+    db.commit()
+    assert backfill(bind=db.get_bind()) == 1
+
+    assert client.get("/game/stats/timeseries", headers=headers).json() == expected
+
+# The days whose logs were dropped by the retention keep their rollup
+def test_backfill_daily_stats_keeps_days_without_logs(client, db, user_token, order_id):
+    from datetime import date
+    import models
+    from jobs.daily_stats import backfill
+    client.patch(f"/orders/{order_id}/complete", headers={"Authorization": f"Bearer {user_token}"})
+    user_id = db.query(models.PlayerDailyStats).one().user_id
+    db.add(models.PlayerDailyStats(user_id=user_id, day=date(2020, 1, 1), money_earned=5, orders_completed=2))
+    db.commit()
+
+    assert backfill(bind=db.get_bind()) == 1
+    db.expire_all()
+    old_day = db.get(models.PlayerDailyStats, (user_id, date(2020, 1, 1)))
+    assert old_day.orders_completed == 2
+
+# GET /leaderboard
+#---------------------------------------------
+# The ranking follows the completed orders, without reloading from the database
+def test_get_leaderboard(client, user_token, second_user_token, menu_id, order_id):
+    from leaderboard import leaderboard
+    headers = {"Authorization": f"Bearer {user_token}"}
+
+    before = client.get("/leaderboard", headers=headers).json()
+    assert before["me"]["total_money_earned"] == 0
+    assert leaderboard.warmed
+
+    client.patch(f"/orders/{order_id}/complete", headers=headers)
+    response = client.get("/leaderboard?limit=1", headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["me"]["rank"] == 1
+    assert data["me"]["total_money_earned"] > 0
+    assert [entry["username"] for entry in data["top"]] == ["user"]
+    assert data["total_players"] == before["total_players"]
+
+    other = client.get("/leaderboard", headers={"Authorization": f"Bearer {second_user_token}"}).json()
+    assert other["me"] is None or other["me"]["rank"] > 1
+
+# Renamed and removed players are applied to the ranking
+def test_leaderboard_rename_and_remove(client, db, admin_token, user_token, order_id):
+    import models
+    from leaderboard import leaderboard
+    headers = {"Authorization": f"Bearer {user_token}"}
+    admin_headers = {"Authorization": f"Bearer {admin_token}"}
+    client.patch(f"/orders/{order_id}/complete", headers=headers)
+    client.get("/leaderboard", headers=headers)
+
+    user_id = db.query(models.User.id).filter(models.User.username == "user").scalar()
+    client.put(f"/users/{user_id}", json={"username": "barista"}, headers=admin_headers)
+    top = client.get("/leaderboard", headers=admin_headers).json()["top"]
+    assert top[0]["username"] == "barista"
+
+    leaderboard.remove(user_id)
+    top = client.get("/leaderboard", headers=admin_headers).json()["top"]
+    assert "barista" not in [entry["username"] for entry in top]
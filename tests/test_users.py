@@ -71,3 +71,63 @@ def test_delete_non_existing_user_ko(client, admin_token):
         headers={"Authorization": f"Bearer {admin_token}"}
     )
     assert response.status_code == 404
+
+# The cached identity is dropped when an admin updates the user
+def test_put_user_invalidates_cached_user(client, admin_token, user_token):
+    from cache import user_cache
+    headers = {"Authorization": f"Bearer {user_token}"}
+    client.get("/inventory", headers=headers)
+
+    response = client.get("/users", headers={"Authorization": f"Bearer {admin_token}"})
+    player = next(u for u in response.json()["users"] if u["username"] == "user")
+    assert user_cache.get(player["id"]).username == "user"
+    client.put(
+        f"/users/{player['id']}",
+        json={"username": "renamed"},
+        headers={"Authorization": f"Bearer {admin_token}"}
+    )
+
+    client.get("/inventory", headers=headers)
+    assert user_cache.get(player["id"]).username == "renamed"
+
+# A deleted user is refused at once, even with a cached identity
+def test_delete_user_invalidates_cached_user(client, admin_token, user_token):
+    headers = {"Authorization": f"Bearer {user_token}"}
+    assert client.get("/inventory", headers=headers).status_code == 200
+
+    response = client.get("/users", headers={"Authorization": f"Bearer {admin_token}"})
+    player = next(u for u in response.json()["users"] if u["username"] == "user")
+    client.delete(f"/users/{player['id']}", headers={"Authorization": f"Bearer {admin_token}"})
+
+    response = client.get("/inventory", headers=headers)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "User not found"
+
+# Deleted through another worker (identity still cached here): 401, not 500
+def test_deleted_user_with_stale_cached_identity(client, db, user_token, menu_id):
+    import models
+    headers = {"Authorization": f"Bearer {user_token}"}
+    assert client.get("/inventory", headers=headers).status_code == 200
+
+    db.query(models.User).filter(models.User.username == "user").delete()
+    db.commit()
+
+    restock = {"menu_item_id": menu_id, "quantity": 1}
+    responses = [
+        client.post("/order/restock", json=restock, headers=headers),
+        client.post("/order/restock/bulk", json={"items": [restock]}, headers=headers),
+        client.get("/game/history", headers=headers),
+        client.get("/game/stats", headers=headers),
+        client.get("/inventory", headers=headers),
+    ]
+    assert [response.status_code for response in responses] == [401] * 5
+    assert {response.json()["detail"] for response in responses} == {"User not found"}
+
+# The admin can read the cache counters
+def test_get_admin_metrics(client, admin_token, user_token):
+    client.get("/inventory", headers={"Authorization": f"Bearer {user_token}"})
+    client.get("/inventory", headers={"Authorization": f"Bearer {user_token}"})
+
+    response = client.get("/admin/metrics", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    assert response.json()["user_cache"]["hits"] >= 1